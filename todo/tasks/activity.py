@@ -0,0 +1,40 @@
+"""
+Comments and attachments of a task, a page at a time.
+
+Busy tasks collect thousands of comments, so the detail page renders only
+the newest page of each and fetches older ones from the ``task_comments``
+and ``task_attachments`` endpoints, passing the ``next_cursor`` of the page
+before (see ``pagination.py``). Tasks in cold storage are paged from the
+archive tables.
+"""
+from django.conf import settings
+
+from . import archive
+from .pagination import CursorPaginator
+
+PAGE_SIZE = getattr(settings, 'TASK_ACTIVITY_PAGE_SIZE', 20)
+
+COMMENT_ORDERING = ('-created_at', '-id')
+ATTACHMENT_ORDERING = ('-uploaded_at', '-id')
+
+
+def comment_page(task, cursor=None, per_page=PAGE_SIZE):
+    """The comments of ``task`` after ``cursor``, newest first, with their authors."""
+    if getattr(task, 'in_cold_storage', False):
+        return _page(archive.comments(task.pk), COMMENT_ORDERING, cursor, per_page, archive.to_comment)
+    return _page(task.comments.select_related('author'), COMMENT_ORDERING, cursor, per_page)
+
+
+def attachment_page(task, cursor=None, per_page=PAGE_SIZE):
+    """The attachments of ``task`` after ``cursor``, newest first, with their uploaders."""
+    if getattr(task, 'in_cold_storage', False):
+        return _page(archive.attachments(task.pk), ATTACHMENT_ORDERING, cursor, per_page, archive.to_attachment)
+    return _page(task.attachments.select_related('uploaded_by'), ATTACHMENT_ORDERING, cursor, per_page)
+
+
+def _page(queryset, ordering, cursor, per_page, convert=None):
+    # Raises InvalidCursor for a malformed cursor.
+    page = CursorPaginator(queryset, per_page, ordering=ordering).page(cursor)
+    if convert is not None:
+        page.object_list = [convert(obj) for obj in page.object_list]
+    return page
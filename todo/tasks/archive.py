@@ -0,0 +1,214 @@
+"""
+Cold storage for archived tasks.
+
+``archive_tasks`` moves archived tasks, and completed tasks older than
+``TASK_ARCHIVE_COMPLETED_AFTER`` days, out of ``tasks_task`` into the
+``ArchivedTask`` tables together with their comments and attachment
+metadata, in batches. The hot table then only holds tasks the board can
+show, and the cold tables can live in their own database
+(``TASK_ARCHIVE_DATABASE``, see ``routers.py``).
+
+Cold tasks are read back as unsaved ``Task`` instances: the board lists
+them when ``show_archived`` is set, and task detail pages fall back to them.
+They no longer count towards the cached statistics.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import bulk, lookups
+from .filters import day_range
+from .forms import TaskSearchForm
+from .models import (
+    ArchivedTask, ArchivedTaskAttachment, ArchivedTaskComment, Category, Member,
+    Priority, Status, Tag, Task, TaskAttachment, TaskComment,
+)
+
+# Completed tasks are archived this many days after completion; None keeps
+# them in the hot table until they are archived explicitly.
+COMPLETED_AFTER = getattr(settings, 'TASK_ARCHIVE_COMPLETED_AFTER', 180)
+
+BATCH_SIZE = 500
+
+# Hot model -> cold model; every cold field except archived_at exists on the hot model.
+COLD_MODELS = {
+    Task: ArchivedTask,
+    TaskComment: ArchivedTaskComment,
+    TaskAttachment: ArchivedTaskAttachment,
+}
+
+
+def archivable():
+    condition = Q(is_archived=True)
+    if COMPLETED_AFTER is not None:
+        cutoff = timezone.now() - timedelta(days=COMPLETED_AFTER)
+        condition |= Q(status__is_completed=True, completed_at__lt=cutoff)
+    return Task.objects.filter(condition)
+
+
+def archive_tasks(batch_size=BATCH_SIZE, limit=None):
+    """Move archivable tasks to cold storage; returns the number moved."""
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        task_ids = list(archivable().order_by('pk').values_list('pk', flat=True)[:size])
+        if not task_ids:
+            break
+        moved += _archive_batch(task_ids)
+    return moved
+
+
+def _archive_batch(task_ids):
+    hot = router.db_for_write(Task)
+    cold = router.db_for_write(ArchivedTask)
+    # With separate databases the copy (the inner block) commits first, so a
+    # failed copy rolls back the delete; ignore_conflicts makes a retry after
+    # a failed delete harmless.
+    with transaction.atomic(using=hot), transaction.atomic(using=cold):
+        _copy(Task.objects.filter(pk__in=task_ids))
+        _copy(TaskComment.objects.filter(task_id__in=task_ids))
+        _copy(TaskAttachment.objects.filter(task_id__in=task_ids))
+        return bulk.apply_action(task_ids, 'delete')
+
+
+def _copy(queryset):
+    cold_model = COLD_MODELS[queryset.model]
+    fields = [field.attname for field in cold_model._meta.concrete_fields if field.name != 'archived_at']
+    cold_model.objects.bulk_create(
+        [cold_model(**row) for row in queryset.values(*fields)],
+        ignore_conflicts=True,
+        batch_size=BATCH_SIZE,
+    )
+
+
+# Read-through
+
+def to_task(archived):
+    """An unsaved Task with the values of ``archived``, for rendering."""
+    task = Task(
+        id=archived.id,
+        name=archived.name,
+        description=archived.description,
+        category=lookups.get(Category, archived.category_id),
+        assigned_to=lookups.get(Member, archived.assigned_to_id),
+        status=lookups.get(Status, archived.status_id),
+        priority=lookups.get(Priority, archived.priority_id),
+        created_at=archived.created_at,
+        updated_at=archived.updated_at,
+        due_date=archived.due_date,
+        completed_at=archived.completed_at,
+        estimated_hours=archived.estimated_hours,
+        actual_hours=archived.actual_hours,
+        tags=archived.tags,
+        is_archived=True,
+        version=archived.version,
+        comment_count=archived.comment_count,
+    )
+    # The tag links were deleted with the hot row; serve tag_names from the string.
+    task._prefetched_objects_cache = {'tag_set': [Tag(name=name) for name in Task.parse_tags(archived.tags)]}
+    task.in_cold_storage = True
+    return task
+
+
+def get_task(pk):
+    archived = ArchivedTask.objects.filter(pk=pk).first()
+    return to_task(archived) if archived else None
+
+
+def comments(task_id):
+    return ArchivedTaskComment.objects.filter(task_id=task_id)
+
+
+def attachments(task_id):
+    return ArchivedTaskAttachment.objects.filter(task_id=task_id)
+
+
+def get_attachment(pk):
+    archived = ArchivedTaskAttachment.objects.filter(pk=pk).first()
+    return to_attachment(archived) if archived else None
+
+
+def _member(pk):
+    return lookups.get(Member, pk) or Member(name='Deleted member')
+
+
+def to_comment(archived):
+    comment = TaskComment(
+        id=archived.id, task_id=archived.task_id, content=archived.content,
+        created_at=archived.created_at, updated_at=archived.updated_at,
+    )
+    comment.author = _member(archived.author_id)
+    return comment
+
+
+def to_attachment(archived):
+    attachment = TaskAttachment(
+        id=archived.id, task_id=archived.task_id, file_name=archived.file_name,
+        file_path=archived.file_path, file_size=archived.file_size, sha256=archived.sha256,
+        content_type=archived.content_type, uploaded_at=archived.uploaded_at,
+    )
+    attachment.uploaded_by = _member(archived.uploaded_by_id)
+    return attachment
+
+
+def search_archived(params, limit):
+    """Up to ``limit`` cold tasks matching the ``TaskSearchForm`` filters in ``params``.
+
+    Returns nothing unless ``show_archived`` is set. Text search uses plain
+    substring matching, as the full-text index only covers the hot table.
+    """
+    form = TaskSearchForm(params)
+    if not form.is_valid() or not form.cleaned_data.get('show_archived'):
+        return []
+    data = form.cleaned_data
+
+    queryset = ArchivedTask.objects.all()
+    if data.get('search_query'):
+        search_in = data.get('search_in')
+        for term in data['search_query'].split():
+            members = [member.pk for member in lookups.get_all(Member) if term.lower() in member.name.lower()]
+            if search_in == 'assigned_to':
+                condition = Q(assigned_to_id__in=members)
+            elif search_in == 'all':
+                condition = (
+                    Q(name__icontains=term) | Q(description__icontains=term)
+                    | Q(tags__icontains=term) | Q(assigned_to_id__in=members)
+                )
+            else:
+                condition = Q(**{f'{search_in}__icontains': term})
+            queryset = queryset.filter(condition)
+    for field in ('category', 'status', 'priority', 'assigned_to'):
+        if data.get(field):
+            queryset = queryset.filter(**{f'{field}_id': data[field].pk})
+    due_from, due_until = day_range(data.get('due_date_from'), data.get('due_date_to'))
+    if due_from:
+        queryset = queryset.filter(due_date__gte=due_from)
+    if due_until:
+        queryset = queryset.filter(due_date__lt=due_until)
+    if data.get('show_overdue'):
+        # TaskQuerySet.overdue_condition without the status join.
+        open_statuses = [status.pk for status in lookups.get_all(Status) if not status.is_completed]
+        queryset = queryset.filter(due_date__lt=timezone.now(), status_id__in=open_statuses)
+
+    tag = data.get('tag')
+    if tag:
+        queryset = queryset.filter(tags__icontains=tag)
+
+    tasks = []
+    for archived in queryset.iterator():
+        if tag and not _has_tag(archived.tags, tag, data.get('tag_match')):
+            continue
+        tasks.append(to_task(archived))
+        if len(tasks) == limit:
+            break
+    return tasks
+
+
+def _has_tag(tags, tag, match):
+    names = Task.parse_tags(tags)
+    if match == 'prefix':
+        return any(name.startswith(tag) for name in names)
+    return tag in names
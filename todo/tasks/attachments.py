@@ -0,0 +1,255 @@
+"""
+Content-addressed attachment storage.
+
+Uploads stream to a temporary file in ``TASK_ATTACHMENT_DIR`` a chunk at a
+time through ``HashingUploadHandler``, which hashes them on the way, so no
+upload is ever held in memory. The finished file is renamed to
+``<dir>/blobs/ab/cd/<sha256>``; when that blob already exists the upload is
+discarded instead, so identical files are stored once however often they
+are attached. ``TaskAttachment.sha256`` points at the blob.
+
+Downloads are served as ``FileResponse`` (``wsgi.file_wrapper``, i.e.
+sendfile where the server supports it) or, with
+``TASK_ATTACHMENT_ACCEL_REDIRECT`` set, handed to the front-end server with
+``X-Accel-Redirect``. Single ``Range`` requests are answered with 206.
+
+Blobs are not deleted with their attachments; ``sweep`` removes the ones no
+attachment refers to any more (the ``sweep_attachments`` command, or a
+``sweep_attachments`` job).
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from .models import ArchivedTaskAttachment, TaskAttachment
+
+ATTACHMENT_DIR = Path(getattr(settings, 'TASK_ATTACHMENT_DIR', settings.BASE_DIR / 'attachments'))
+BLOB_DIR = ATTACHMENT_DIR / 'blobs'
+UPLOAD_DIR = ATTACHMENT_DIR / 'uploads'
+
+# Internal location the front-end server maps to BLOB_DIR, e.g. '/protected/blobs/'.
+ACCEL_REDIRECT = getattr(settings, 'TASK_ATTACHMENT_ACCEL_REDIRECT', None)
+
+# Unreferenced blobs and abandoned uploads younger than this are kept, as an
+# upload may be between storing its blob and saving its attachment.
+SWEEP_GRACE = getattr(settings, 'TASK_ATTACHMENT_SWEEP_GRACE', 60 * 60)
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+class HashedUploadedFile(UploadedFile):
+    """An upload streamed to a temporary file, with its SHA-256."""
+
+    def __init__(self, file, name, content_type, size, charset, sha256):
+        super().__init__(file, name, content_type, size, charset)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Write uploaded files to ``UPLOAD_DIR``, hashing each chunk as it arrives.
+
+    Install it before the request body is read; see ``views.upload_attachment``.
+    """
+    chunk_size = CHUNK_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix='.upload', delete=False)
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file.write(raw_data)
+        self.hash.update(raw_data)
+        self.size += len(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.flush()
+        self.file.seek(0)
+        return HashedUploadedFile(
+            self.file, self.file_name, self.content_type, self.size,
+            self.charset, self.hash.hexdigest(),
+        )
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()
+            os.unlink(self.file.name)
+
+
+def blob_path(sha256):
+    return BLOB_DIR / sha256[:2] / sha256[2:4] / sha256
+
+
+def store(upload):
+    """Move ``upload`` (a ``HashedUploadedFile``) into blob storage; returns its path."""
+    path = blob_path(upload.sha256)
+    upload.close()
+    if path.exists():
+        os.unlink(upload.temporary_file_path())
+        # Restart the sweeper's grace period for a blob that may be unreferenced.
+        os.utime(path)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(upload.temporary_file_path(), path)
+    return path
+
+
+def discard(upload):
+    upload.close()
+    try:
+        os.unlink(upload.temporary_file_path())
+    except FileNotFoundError:
+        pass
+
+
+def attach(task, upload, uploaded_by):
+    store(upload)
+    return TaskAttachment.objects.create(
+        task=task,
+        file_name=os.path.basename(upload.name)[:255],
+        file_path=str(blob_path(upload.sha256).relative_to(ATTACHMENT_DIR)),
+        file_size=upload.size,
+        sha256=upload.sha256,
+        content_type=(upload.content_type or '')[:100],
+        uploaded_by=uploaded_by,
+    )
+
+
+# Downloads
+
+def serve(request, attachment):
+    """A response with the contents of ``attachment``, honouring ``Range``.
+
+    Returns None when its blob is missing.
+    """
+    path = blob_path(attachment.sha256) if attachment.sha256 else None
+    if path is None or not path.exists():
+        return None
+    size = path.stat().st_size
+    etag = f'"{attachment.sha256}"'
+
+    byte_range = _parse_range(request, size, etag)
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if ACCEL_REDIRECT and byte_range is None:
+        # The front-end server sends the file, and handles Range itself.
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = ACCEL_REDIRECT + str(path.relative_to(BLOB_DIR))
+        response['Content-Type'] = attachment.content_type or 'application/octet-stream'
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=attachment.content_type or None)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(path, start, end), status=206,
+            content_type=attachment.content_type or 'application/octet-stream',
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Content-Disposition'] = content_disposition_header(True, attachment.file_name)
+    return response
+
+
+def _parse_range(request, size, etag):
+    """``(start, end)`` inclusive, None for the whole file, or 'unsatisfiable'.
+
+    Multiple ranges, malformed headers and stale ``If-Range`` validators get
+    the whole file, as RFC 9110 allows.
+    """
+    header = request.headers.get('Range')
+    if not header or request.headers.get('If-Range', etag) != etag:
+        return None
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # A suffix range: the last N bytes.
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+# Sweeping
+
+def sweep(grace=SWEEP_GRACE, batch_size=500):
+    """Delete unreferenced blobs and abandoned uploads older than ``grace`` seconds.
+
+    Returns ``(blobs removed, bytes freed)``.
+    """
+    cutoff = time.time() - grace
+
+    if UPLOAD_DIR.exists():
+        for path in UPLOAD_DIR.iterdir():
+            if _older(path, cutoff):
+                path.unlink(missing_ok=True)
+
+    removed = freed = 0
+    candidates = (
+        path for path in (BLOB_DIR.glob('*/*/*') if BLOB_DIR.exists() else ())
+        if SHA256.match(path.name) and _older(path, cutoff)
+    )
+    while batch := list(islice(candidates, batch_size)):
+        hashes = [path.name for path in batch]
+        referenced = {
+            *TaskAttachment.objects.filter(sha256__in=hashes).values_list('sha256', flat=True),
+            *ArchivedTaskAttachment.objects.filter(sha256__in=hashes).values_list('sha256', flat=True),
+        }
+        for path in batch:
+            # Re-check the age: store() touches a blob it deduplicates against.
+            if path.name in referenced or not _older(path, cutoff):
+                continue
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            removed += 1
+            freed += size
+    return removed, freed
+
+
+def _older(path, cutoff):
+    try:
+        return path.stat().st_mtime < cutoff
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,359 @@
+"""
+Benchmark harness for the task views.
+
+Each scenario drives a view through the Django test client against the
+configured database (use a disposable one filled by ``generate_tasks``; the
+write scenarios modify data) and records latency percentiles, queries per
+request and peak Python memory. A scenario whose responses are not the
+expected status (any 2xx or 304 unless it says otherwise) is reported as an
+error instead of timed. Results are plain dicts so they can be saved as JSON
+and compared between commits.
+
+``run_load`` measures throughput instead: it sends concurrent requests
+straight to the project's WSGI and ASGI handlers, in process and without a
+network server, so the two can be compared on the same database.
+``run_contention`` does the same with reads and writes mixed, to measure
+how they block each other on the database lock.
+"""
+import asyncio
+import io
+import json
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from functools import cache
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Priority, Status, Task
+
+BENCHMARK_USER = 'benchmark'
+
+
+class Scenario:
+    def __init__(self, name, request, expected_status=None):
+        self.name = name
+        # request(client, rng) -> response
+        self.request = request
+        # None accepts any 2xx and 304.
+        self.expected_status = expected_status
+
+    def succeeded(self, response):
+        if self.expected_status is not None:
+            return response.status_code == self.expected_status
+        return 200 <= response.status_code < 300 or response.status_code == 304
+
+
+@cache
+def _existing_task_ids():
+    # Loaded once per run, outside the timed requests.
+    ids = list(Task.objects.order_by('pk').values_list('pk', flat=True))
+    if not ids:
+        raise ValueError('No tasks to benchmark; fill the database with generate_tasks first')
+    return ids
+
+
+def _task_ids(rng, count):
+    """``count`` ids of tasks that exist, so detail and move requests don't 404."""
+    return rng.choices(_existing_task_ids(), k=count)
+
+
+def _move_task(client, rng):
+    task_id = _task_ids(rng, 1)[0]
+    status_id = rng.choice(list(Status.objects.values_list('pk', flat=True)))
+    return client.post(
+        reverse('update_task_status'),
+        json.dumps({'task_id': task_id, 'status_id': status_id}),
+        content_type='application/json',
+    )
+
+
+def _bulk_change_priority(client, rng):
+    return client.post(reverse('bulk_actions'), {
+        'action': 'change_priority',
+        'task_ids': _task_ids(rng, 100),
+        'priority_id': rng.choice(list(Priority.objects.values_list('pk', flat=True))),
+    })
+
+
+SCENARIOS = [
+    Scenario('task_list', lambda client, rng: client.get(reverse('task_list'))),
+    Scenario('task_list_search', lambda client, rng: client.get(
+        reverse('task_list'), {'search_in': 'all', 'search_query': 'deploy cache'}
+    )),
+    Scenario('task_list_api', lambda client, rng: client.get(reverse('task_list_api'))),
+    Scenario('dashboard', lambda client, rng: client.get(reverse('dashboard'))),
+    Scenario('task_detail', lambda client, rng: client.get(
+        reverse('task_detail', args=[_task_ids(rng, 1)[0]])
+    )),
+    Scenario('update_task_status', _move_task),
+    Scenario('bulk_actions', _bulk_change_priority, expected_status=302),
+]
+
+
+def get_client():
+    user, _ = User.objects.get_or_create(username=BENCHMARK_USER)
+    client = Client(raise_request_exception=False, SERVER_NAME='localhost')
+    client.force_login(user)
+    return client
+
+
+@contextmanager
+def _capture_queries():
+    """Capture the queries run on every database alias; yields the contexts."""
+    with ExitStack() as stack:
+        yield [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+
+
+def run_scenario(scenario, client, iterations, seed=0):
+    rng = random.Random(seed)
+    # Warm up caches and connections before measuring.
+    response = scenario.request(client, rng)
+    if not scenario.succeeded(response):
+        # Timings of error pages would pass for the view's.
+        return {'error': f'HTTP {response.status_code}'}
+
+    timings = []
+    query_counts = []
+    statuses = set()
+    for _ in range(iterations):
+        with _capture_queries() as captured:
+            start = time.perf_counter()
+            response = scenario.request(client, rng)
+            timings.append(time.perf_counter() - start)
+        if not scenario.succeeded(response):
+            return {'error': f'HTTP {response.status_code}'}
+        query_counts.append(sum(len(queries.captured_queries) for queries in captured))
+        statuses.add(response.status_code)
+
+    # Memory tracing slows everything down, so it gets its own run.
+    tracemalloc.start()
+    scenario.request(client, rng)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(_percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(_percentile(timings, 95) * 1000, 2),
+        'mean_ms': round(statistics.mean(timings) * 1000, 2),
+        'queries': max(query_counts),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'status_codes': sorted(statuses),
+    }
+
+
+def _percentile(values, percentile):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percentile - 1]
+
+
+def run_benchmarks(iterations=20, names=None, seed=0):
+    _existing_task_ids.cache_clear()
+    client = get_client()
+    results = {}
+    for scenario in SCENARIOS:
+        if names and scenario.name not in names:
+            continue
+        results[scenario.name] = run_scenario(scenario, client, iterations, seed)
+    return {
+        'commit': _git_commit(),
+        'timestamp': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'tasks': Task.objects.count(),
+        'results': results,
+    }
+
+
+def run_load(server, path, concurrency=8, requests=200):
+    """Send ``requests`` GETs for ``path`` to the ``'wsgi'`` or ``'asgi'`` handler.
+
+    WSGI requests run on ``concurrency`` threads, as under a threaded server;
+    ASGI requests run as ``concurrency`` concurrent tasks on one event loop.
+    """
+    client = get_client()
+    cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+    path, _, query = path.partition('?')
+    if server == 'wsgi':
+        timings, statuses, elapsed = _wsgi_load(path, query, cookie, concurrency, requests)
+    elif server == 'asgi':
+        timings, statuses, elapsed = asyncio.run(_asgi_load(path, query, cookie, concurrency, requests))
+    else:
+        raise ValueError(f'Unknown server {server!r}')
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'requests_per_second': round(requests / elapsed, 1),
+        'p50_ms': round(_percentile(timings, 50) * 1000, 2),
+        'p95_ms': round(_percentile(timings, 95) * 1000, 2),
+        'status_codes': sorted(statuses),
+    }
+
+
+def _wsgi_request(application, path, query, cookie, method='GET', body=b''):
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_COOKIE': cookie,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.url_scheme': 'http',
+    }
+    status = []
+    start = time.perf_counter()
+    response = application(environ, lambda code, headers, exc_info=None: status.append(code))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return time.perf_counter() - start, int(status[0].split()[0])
+
+
+def _wsgi_load(path, query, cookie, concurrency, requests):
+    application = get_wsgi_application()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: _wsgi_request(application, path, query, cookie), range(requests)))
+    elapsed = time.perf_counter() - start
+    return [timing for timing, _ in results], {code for _, code in results}, elapsed
+
+
+def run_contention(path='/', readers=8, writers=4, requests=400, seed=0):
+    """Mix board reads with task status writes on concurrent WSGI threads.
+
+    ``readers`` threads GET ``path`` while ``writers`` threads move random
+    tasks through ``update_task_status``, ``requests`` in total, in the
+    proportion of the thread counts. Reports throughput, latency and the
+    number of failed (5xx) requests for each side; under lock contention
+    the failures are "database is locked" errors.
+    """
+    _existing_task_ids.cache_clear()
+    client = get_client()
+    cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+    path, _, query = path.partition('?')
+    rng = random.Random(seed)
+    status_ids = list(Status.objects.values_list('pk', flat=True))
+    writes = [
+        json.dumps({'task_id': task_id, 'status_id': rng.choice(status_ids)}).encode()
+        for task_id in _task_ids(rng, requests * writers // (readers + writers))
+    ]
+    application = get_wsgi_application()
+    update_path = reverse('update_task_status')
+
+    def side(count, concurrency, request):
+        if not count:
+            return None
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(request, range(count)))
+        elapsed = time.perf_counter() - start
+        timings = [timing for timing, _ in results]
+        return {
+            'requests': count,
+            'requests_per_second': round(count / elapsed, 1),
+            'p50_ms': round(_percentile(timings, 50) * 1000, 2),
+            'p95_ms': round(_percentile(timings, 95) * 1000, 2),
+            'errors': sum(code >= 500 for _, code in results),
+        }
+
+    with ThreadPoolExecutor(2) as sides:
+        reads = sides.submit(
+            side, requests - len(writes), readers,
+            lambda _: _wsgi_request(application, path, query, cookie),
+        )
+        moves = sides.submit(
+            side, len(writes), writers,
+            lambda i: _wsgi_request(application, update_path, '', cookie, 'POST', writes[i]),
+        )
+        return {'reads': reads.result(), 'writes': moves.result()}
+
+
+async def _asgi_load(path, query, cookie, concurrency, requests):
+    application = get_asgi_application()
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+        'server': ('localhost', 80),
+    }
+    remaining = iter(range(requests))
+    timings = []
+    statuses = set()
+
+    async def request():
+        received = False
+        disconnect = asyncio.Event()
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # Only the end of the response "disconnects" the client.
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.add(message['status'])
+            elif not message.get('more_body'):
+                disconnect.set()
+
+        start = time.perf_counter()
+        await application(dict(scope), receive, send)
+        timings.append(time.perf_counter() - start)
+
+    async def worker():
+        for _ in remaining:
+            await request()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings, statuses, time.perf_counter() - start
+
+
+def compare(previous, current):
+    """Yield ``(scenario, metric, before, after, change %)`` for shared scenarios."""
+    for name, after in current['results'].items():
+        before = previous['results'].get(name)
+        if not before or 'error' in before or 'error' in after:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'queries', 'peak_memory_kb'):
+            old, new = before[metric], after[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            yield name, metric, old, new, change
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,86 @@
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from . import lookups
+
+# Rendered cards and columns are cached for this many seconds. Cards show
+# time-relative text (due in, overdue by, created ago), so this also bounds
+# how stale that text can be.
+CARD_CACHE_TTL = getattr(settings, 'TASK_CARD_CACHE_TTL', 60)
+
+
+class BoardColumn(NamedTuple):
+    status: object
+    tasks: list
+    count: int
+
+    @property
+    def hidden_count(self):
+        return self.count - len(self.tasks)
+
+    @property
+    def fingerprint(self):
+        """Changes whenever a task enters, leaves or changes in the column."""
+        return (self.count, tuple((task.pk, task.version) for task in self.tasks))
+
+
+def fragment_version():
+    """Cache key part shared by all card and column fragments.
+
+    Cards show the names and colors of reference tables, so any change to
+    those starts new fragments, as does the start of each ``CARD_CACHE_TTL``
+    period. Changes to a task itself bump ``Task.version``, which is part of
+    the card and column keys.
+    """
+    return f'{lookups.version()}:{int(time.time() // CARD_CACHE_TTL)}'
+
+
+def build_board(queryset, statuses, per_column_limit=None):
+    """Partition the tasks of ``queryset`` into one column per status.
+
+    The tasks are fetched in a single query and the per-status totals in a
+    second grouped query, regardless of the number of statuses. When
+    ``per_column_limit`` is given only the first N tasks of each column (in
+    the queryset's ordering) are materialized; ``count`` still reports the
+    full column size.
+    """
+    statuses = list(statuses)
+    status_ids = [status.pk for status in statuses]
+    queryset = queryset.filter(status__in=status_ids)
+
+    counts = dict(
+        queryset.order_by()
+        .values_list('status')
+        .annotate(total=Count('pk'))
+    )
+
+    if per_column_limit is not None:
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        queryset = queryset.annotate(
+            column_row=Window(
+                RowNumber(),
+                partition_by=F('status'),
+                order_by=[_order_expression(field) for field in ordering],
+            )
+        ).filter(column_row__lte=per_column_limit)
+
+    buckets = {status_id: [] for status_id in status_ids}
+    for task in queryset:
+        buckets[task.status_id].append(task)
+
+    return [
+        BoardColumn(status, buckets[status.pk], counts.get(status.pk, 0))
+        for status in statuses
+    ]
+
+
+def _order_expression(field):
+    if hasattr(field, 'resolve_expression'):
+        return field
+    if field.startswith('-'):
+        return F(field[1:]).desc()
+    return F(field).asc()
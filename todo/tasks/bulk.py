@@ -0,0 +1,127 @@
+"""
+Bulk task changes, shared by the ``bulk_actions`` view and background jobs.
+
+Changes are applied ``CHUNK_SIZE`` tasks at a time, each chunk in its own
+transaction, so a large selection never holds the database lock for long.
+Per-object signals are not sent; instead each committed chunk sends one
+``signals.tasks_changed`` with the before and after state of its tasks,
+which keeps the statistics and live boards current.
+"""
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import CASCADE, DO_NOTHING, F
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from .models import Task
+from .signals import tasks_changed
+
+ACTIONS = ('delete', 'archive', 'change_status', 'change_priority')
+
+# Selections larger than this run as a background job (see ``jobs.py``).
+INLINE_LIMIT = getattr(settings, 'TASK_BULK_INLINE_LIMIT', 200)
+
+# Tasks changed per transaction.
+CHUNK_SIZE = getattr(settings, 'TASK_BULK_CHUNK_SIZE', 500)
+
+
+class TaskState(NamedTuple):
+    id: int
+    status_id: int
+    priority_id: int
+    version: int
+
+
+def apply_action(task_ids, action, status=None, priority=None, progress=None):
+    """Apply ``action`` to the tasks with ``task_ids``, chunk by chunk.
+
+    ``status`` and ``priority`` are the targets of ``change_status`` and
+    ``change_priority``. ``progress(done)`` is called after each chunk with
+    the number of ids handled so far. Returns the number of tasks changed.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f'Unknown bulk action {action!r}')
+    task_ids = list(dict.fromkeys(task_ids))
+
+    changed = 0
+    for start in range(0, len(task_ids), CHUNK_SIZE):
+        chunk = task_ids[start:start + CHUNK_SIZE]
+        changed += _apply_chunk(chunk, action, status, priority)
+        if progress is not None:
+            progress(start + len(chunk))
+    return changed
+
+
+def _apply_chunk(task_ids, action, status, priority):
+    with transaction.atomic():
+        before = [
+            TaskState(*values)
+            for values in Task.objects.select_for_update()
+            .filter(pk__in=task_ids)
+            .values_list('pk', 'status_id', 'priority_id', 'version')
+        ]
+        if not before:
+            return 0
+        tasks = Task.objects.filter(pk__in=[state.id for state in before])
+
+        if action == 'delete':
+            if not _delete(tasks):
+                # Per-object signals were sent instead.
+                return len(before)
+            after = None
+        else:
+            now = timezone.now()
+            # update() skips Task.save(), so maintain what it would have.
+            changes = {'version': F('version') + 1, 'updated_at': now}
+            if action == 'archive':
+                changes['is_archived'] = True
+            elif action == 'change_status':
+                changes['status'] = status
+                if status.is_completed:
+                    changes['completed_at'] = now
+            elif action == 'change_priority':
+                changes['priority'] = priority
+            tasks.update(**changes)
+            after = [
+                state._replace(
+                    status_id=status.pk if status else state.status_id,
+                    priority_id=priority.pk if priority else state.priority_id,
+                    version=state.version + 1,
+                )
+                for state in before
+            ]
+
+        transaction.on_commit(lambda: tasks_changed.send(
+            sender=Task, action=action, before=before, after=after,
+        ))
+    return len(before)
+
+
+def _delete(tasks):
+    """Delete ``tasks`` with plain DELETEs when their cascades allow it.
+
+    Rows that cascade from a task (comments, attachments, tag links) are
+    deleted directly when nothing listens for their deletion and they have
+    no cascades of their own. Otherwise the regular collector runs, which
+    loads the tasks and sends per-object signals; returns False then.
+    """
+    using = router.db_for_write(Task)
+    collector = Collector(using=using)
+    related = []
+    for relation in Task._meta.related_objects:
+        if relation.on_delete is DO_NOTHING:
+            continue
+        queryset = relation.related_model._base_manager.using(using).filter(
+            **{f'{relation.field.name}__in': tasks}
+        )
+        if relation.on_delete is not CASCADE or not collector.can_fast_delete(queryset):
+            tasks.delete()
+            return False
+        related.append(queryset)
+
+    for queryset in related:
+        queryset._raw_delete(using)
+    tasks._raw_delete(using)
+    return True
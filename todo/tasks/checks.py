@@ -0,0 +1,24 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+def cache_is_process_local():
+    """Whether each worker process has its own copy of the default cache."""
+    return isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if not cache_is_process_local():
+        return []
+    return [Warning(
+        'The default cache is local to each process.',
+        hint=(
+            'Task statistics, lookups and saved filters are shared through the '
+            'cache; with several worker processes each keeps its own copy. '
+            'Configure a shared cache such as Redis or Memcached.'
+        ),
+        id='tasks.W001',
+    )]
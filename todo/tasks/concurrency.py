@@ -0,0 +1,76 @@
+"""
+Run independent ORM work concurrently.
+
+Django runs the queries of one request one after another on one connection,
+so a view that needs several independent results waits for the sum of their
+latencies. ``gather`` runs each callable on a worker thread with its own
+database connection, bringing that down to roughly the slowest one.
+
+The workers are a pool of ``TASK_CONCURRENT_QUERY_WORKERS`` threads shared
+by all requests, so their connections are reused like a request thread's
+and closed by the same ``CONN_MAX_AGE`` rules, and the number of extra
+connections stays bounded.
+
+Inside a transaction the callables run one after another on the current
+connection instead: other connections cannot see its uncommitted writes
+(this is also what keeps ``TestCase`` data visible). So do callables that
+are themselves running on a worker, which could otherwise wait for a full
+pool. Setting ``TASK_CONCURRENT_QUERIES = False`` does the same everywhere.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+WORKERS = getattr(settings, 'TASK_CONCURRENT_QUERY_WORKERS', 8)
+
+_executor = ThreadPoolExecutor(WORKERS, thread_name_prefix='tasks-concurrency')
+_worker = threading.local()
+
+
+def _enabled():
+    return (
+        getattr(settings, 'TASK_CONCURRENT_QUERIES', True)
+        and not connection.in_atomic_block
+        and not getattr(_worker, 'busy', False)
+    )
+
+
+def _on_own_connection(function):
+    def run():
+        # Apply CONN_MAX_AGE and health checks to the worker's connections
+        # as a request would.
+        close_old_connections()
+        _worker.busy = True
+        try:
+            return function()
+        finally:
+            _worker.busy = False
+            close_old_connections()
+    return run
+
+
+async def gather(*functions):
+    """Call the blocking ``functions`` concurrently and return their results in order."""
+    if not await sync_to_async(_enabled)():
+        return [await sync_to_async(function)() for function in functions]
+    return await asyncio.gather(*(
+        sync_to_async(_on_own_connection(function), thread_sensitive=False, executor=_executor)()
+        for function in functions
+    ))
+
+
+def run_concurrently(*functions):
+    """``gather`` for synchronous callers."""
+    if not _enabled():
+        return [function() for function in functions]
+    # Each call gets its own copy of the context, as sync_to_async would.
+    futures = [
+        _executor.submit(contextvars.copy_context().run, _on_own_connection(function))
+        for function in functions
+    ]
+    return [future.result() for future in futures]
@@ -0,0 +1,103 @@
+"""
+Conditional GET for the board, dashboard and task detail pages.
+
+Each page gets an ETag built from cheap validators, computed before the
+view runs; a client that sends it back in ``If-None-Match`` gets a 304
+without any of the page's own queries or rendering. The validators are:
+
+* the task count from the ``stats`` cache and the latest ``updated_at``
+  (one index lookup) for the board and dashboard. Every task write
+  refreshes ``updated_at`` (``save``, bulk actions, moves) and deletes
+  change the count;
+* the number of the user's saved filters and their latest ``updated_at``
+  for the board, which lists them all;
+* the task's ``version``, comment count and newest comment and attachment
+  ids (one query) for a task page;
+* the reference table versions and the ``CARD_CACHE_TTL`` period, both part
+  of ``board.fragment_version()``, since pages show relative times;
+* the user, as pages carry their name and CSRF token.
+
+Requests with pending ``django.contrib.messages`` get no ETag, so the page
+that shows them is always rendered.
+
+Only ETags are sent: deletions do not advance any timestamp, so a
+``Last-Modified`` validator would let clients keep deleted tasks.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from . import stats
+from .board import fragment_version
+from .models import ArchivedTask, Task, TaskAttachment, TaskComment
+
+
+def conditional(etag_func):
+    """``condition(etag_func=...)`` that also works for async views.
+
+    Django calls ``etag_func`` directly on the event loop for async views,
+    where it cannot query the database; here it runs in a thread instead.
+    """
+    def decorator(view):
+        if not iscoroutinefunction(view):
+            return condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+            return await condition(etag_func=lambda *_, **__: etag)(view)(request, *args, **kwargs)
+        return inner
+    return decorator
+
+
+def _etag(request, *validators):
+    if not request.user.is_authenticated:
+        # Let the login redirect through.
+        return None
+    # len() loads the messages without marking them as shown.
+    if len(get_messages(request)):
+        return None
+    key = repr((request.user.pk, fragment_version(), validators))
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def task_table_state():
+    updated = Task.objects.aggregate(updated=Max('updated_at'))['updated']
+    return stats.get_stats()['total_tasks'], updated
+
+
+def board_etag(request, *args, **kwargs):
+    validators = task_table_state()
+    if request.user.is_authenticated:
+        # Saving, editing or deleting a filter changes the page without
+        # touching a task.
+        filters = request.user.saved_filters.aggregate(count=Count('pk'), updated=Max('updated_at'))
+        validators += (filters['count'], filters['updated'])
+    return _etag(request, 'board', *validators)
+
+
+def dashboard_etag(request, *args, **kwargs):
+    return _etag(request, 'dashboard', *task_table_state())
+
+
+def task_etag(request, pk, *args, **kwargs):
+    def newest(model):
+        return Subquery(model.objects.filter(task=OuterRef('pk')).order_by('-id').values('id')[:1])
+
+    row = Task.objects.filter(pk=pk).values_list(
+        'version', 'comment_count', newest(TaskComment), newest(TaskAttachment),
+        Subquery(
+            TaskAttachment.objects.filter(task=OuterRef('pk'))
+            .order_by().values('task').annotate(count=Count('pk')).values('count')
+        ),
+    ).first()
+    if row is None:
+        # Tasks in cold storage no longer change.
+        if not ArchivedTask.objects.filter(pk=pk).exists():
+            return None
+        row = ('archived',)
+    return _etag(request, 'task', pk, *row)
@@ -0,0 +1,126 @@
+"""
+SQLite connection tuning and read routing.
+
+Every SQLite connection runs ``TASK_SQLITE_PRAGMAS`` when it opens. WAL
+lets readers carry on while a write commits; ``busy_timeout`` makes a
+writer wait for the lock instead of failing with "database is locked";
+``synchronous=NORMAL`` is durable enough under WAL and saves an fsync per
+commit; ``mmap_size`` serves reads from the page cache.
+
+GET requests to views decorated with ``read_only`` (the board, dashboard
+and task detail) send their queries to ``TASK_READ_DATABASE``, a second
+alias for the same file whose connections are opened with ``query_only``.
+Everything else, and anything inside a transaction on the writer, uses
+``default``, so no request ever reads around its own uncommitted writes.
+"""
+import contextvars
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PRAGMAS = getattr(settings, 'TASK_SQLITE_PRAGMAS', {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+})
+
+_reading = contextvars.ContextVar('tasks_read_only', default=False)
+
+
+def read_database():
+    """The alias read-only views use, or None to keep them on ``default``."""
+    alias = getattr(settings, 'TASK_READ_DATABASE', None)
+    return alias if alias in settings.DATABASES and alias != DEFAULT_DB_ALIAS else None
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        if connection.alias == read_database():
+            cursor.execute('PRAGMA query_only = ON')
+
+
+def read_only(view):
+    """Run ``view`` (and render its response) on the read database.
+
+    Only GET and HEAD requests; ``Model.save`` is not atomic, so a POST
+    handler's own reads could otherwise miss its writes.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        token = _reading.set(True)
+        try:
+            return _render_reading(view(request, *args, **kwargs))
+        finally:
+            _reading.reset(token)
+
+    @wraps(view)
+    async def async_wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view(request, *args, **kwargs)
+        token = _reading.set(True)
+        try:
+            return _render_reading(await view(request, *args, **kwargs))
+        finally:
+            _reading.reset(token)
+
+    return async_wrapper if iscoroutinefunction(view) else wrapper
+
+
+def _render_reading(response):
+    # TemplateResponses query while rendering, which the handler does after
+    # the view (and template response middleware) returns.
+    if not hasattr(response, 'render') or response.is_rendered:
+        return response
+    render = response.render
+
+    @wraps(render)
+    def render_reading():
+        token = _reading.set(True)
+        try:
+            return render()
+        finally:
+            _reading.reset(token)
+
+    response.render = render_reading
+    return response
+
+
+class ReadRouter:
+    """Send reads made inside ``read_only`` views to ``read_database()``.
+
+    Writes always go to ``default``, including saves of objects that were
+    loaded from the read database.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_database()
+        if alias and _reading.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS if read_database() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database.
+        aliases = {DEFAULT_DB_ALIAS, read_database()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == read_database():
+            return False
+        return None
@@ -0,0 +1,119 @@
+"""
+Live board events.
+
+Task writes publish small events (``task.created``, ``task.updated``,
+``task.moved``, ``task.archived``, ``task.deleted``) once their transaction
+commits. Boards receive them over the Server-Sent Events stream of the
+``task_events`` view, which is only served by the ASGI application: under
+WSGI each open board would hold a worker for as long as it stays open, so
+there the view answers 204 (which tells EventSource not to reconnect) and
+the board leaves the stream out.
+
+Events go through the backend named by ``settings.TASK_EVENTS_BACKEND``. The
+default ``InProcessBackend`` only reaches subscribers in the same process,
+which suits a single ASGI worker and the tests; a deployment with several
+workers needs a backend with the same three methods over a shared broker.
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+EVENT_FIELDS = ('id', 'status_id', 'version')
+
+
+def live_updates(request):
+    """Whether ``request`` came through the ASGI handler, which can hold event streams open."""
+    return isinstance(request, ASGIRequest)
+
+
+class Subscription:
+    def __init__(self, max_pending):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_pending)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def _deliver(self, event):
+        # Runs on the subscriber's event loop.
+        if self.queue.full():
+            # The client fell behind; replace the backlog with one event
+            # that tells it to reload the board.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {'event': 'resync'}
+        self.queue.put_nowait(event)
+
+
+class InProcessBackend:
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        """Return a Subscription bound to the running event loop."""
+        subscription = Subscription(self.max_pending)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, event):
+        """Deliver ``event`` to every subscriber; safe to call from any thread."""
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # The subscriber's loop is closed.
+                self.unsubscribe(subscription)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'TASK_EVENTS_BACKEND', 'tasks.events.InProcessBackend')
+        _backend = import_string(path)()
+    return _backend
+
+
+def publish(event, tasks):
+    """Publish ``event`` for ``tasks`` once the current transaction commits.
+
+    ``tasks`` are Task instances or dicts with the ``EVENT_FIELDS``.
+    """
+    payload = {'event': event, 'tasks': [_task_fields(task) for task in tasks]}
+    if payload['tasks']:
+        transaction.on_commit(lambda: get_backend().publish(payload))
+
+
+def _task_fields(task):
+    if isinstance(task, dict):
+        return {field: task[field] for field in EVENT_FIELDS}
+    return {field: getattr(task, field) for field in EVENT_FIELDS}
+
+
+async def stream(subscription, heartbeat=15):
+    """Yield ``subscription``'s events as Server-Sent Events."""
+    yield 'retry: 3000\n\n'
+    while True:
+        try:
+            event = await asyncio.wait_for(subscription.get(), heartbeat)
+        except asyncio.TimeoutError:
+            # A comment line keeps proxies from closing an idle stream.
+            yield ': heartbeat\n\n'
+            continue
+        yield f'data: {json.dumps(event)}\n\n'
@@ -0,0 +1,93 @@
+"""
+Facet counts for the search form.
+
+For the current ``TaskSearchForm`` filters, ``get_facets`` counts the tasks
+each category, status, priority and assignee option would select, and the
+overdue tasks. Each dimension is counted with the other dimensions' choices
+applied but not its own, so the options show what choosing them instead
+would give.
+
+All of it comes from one grouped query: ``filter_tasks`` with the four
+choices and the overdue flag removed, grouped by the four foreign keys,
+with a total and an overdue count per group; the dimensions are then summed
+from the groups in Python. ``task_facet_idx`` covers that query. Results
+are cached per normalized filter for ``TASK_FACET_CACHE_TTL`` seconds, so
+counts can lag task writes by that long. Tasks in cold storage are not
+counted.
+"""
+import hashlib
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import lookups
+from .filters import filter_tasks, search_params
+from .forms import TaskSearchForm
+from .models import Status, Task
+
+CACHE_TTL = getattr(settings, 'TASK_FACET_CACHE_TTL', 60)
+
+DIMENSIONS = ('category', 'status', 'priority', 'assigned_to')
+
+
+def _cache_key(params):
+    key = json.dumps(search_params(params), sort_keys=True)
+    return 'facets:' + hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def get_facets(params):
+    """``{dimension: {pk: count}, 'overdue': count}`` for the filters in ``params``.
+
+    A ``None`` key counts the tasks without a value for that dimension.
+    """
+    return cache.get_or_set(_cache_key(params), lambda: count_facets(params), timeout=CACHE_TTL)
+
+
+def count_facets(params):
+    form = TaskSearchForm(params)
+    selected = dict.fromkeys(DIMENSIONS)
+    overdue_only = False
+    base = params
+    if form.is_valid():
+        for dimension in DIMENSIONS:
+            choice = form.cleaned_data.get(dimension)
+            selected[dimension] = choice.pk if choice else None
+        overdue_only = form.cleaned_data.get('show_overdue')
+        base = {
+            name: value for name, value in search_params(params).items()
+            if name not in DIMENSIONS and name != 'show_overdue'
+        }
+
+    # TaskQuerySet.overdue_condition without the status join, so the
+    # query stays on the index.
+    open_statuses = [status.pk for status in lookups.get_all(Status) if not status.is_completed]
+    overdue = Q(due_date__lt=timezone.now(), status_id__in=open_statuses)
+    groups = (
+        filter_tasks(base, Task.objects.all())
+        .order_by()
+        .values_list(*(f'{dimension}_id' for dimension in DIMENSIONS))
+        .annotate(total=Count('pk'), overdue=Count('pk', filter=overdue))
+    )
+
+    counts = {dimension: Counter() for dimension in DIMENSIONS}
+    overdue_total = 0
+    for *values, total, overdue_count in groups:
+        group = dict(zip(DIMENSIONS, values))
+        mismatched = [
+            dimension for dimension in DIMENSIONS
+            if selected[dimension] is not None and group[dimension] != selected[dimension]
+        ]
+        if not mismatched:
+            overdue_total += overdue_count
+        for dimension in DIMENSIONS:
+            # Counted for a dimension when only that dimension's own choice differs.
+            if not mismatched or mismatched == [dimension]:
+                counts[dimension][group[dimension]] += overdue_count if overdue_only else total
+
+    facets = {dimension: dict(counts[dimension]) for dimension in DIMENSIONS}
+    facets['overdue'] = overdue_total
+    return facets
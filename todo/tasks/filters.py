@@ -0,0 +1,95 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .forms import TaskSearchForm
+from .models import Task, TaskTag
+from .search import search_tasks
+
+
+def task_queryset():
+    """Tasks with everything a board card or listing row renders."""
+    return Task.objects.select_related(
+        'category', 'assigned_to', 'status', 'priority'
+    ).prefetch_related('tag_set').with_due_dates()
+
+
+def day_range(start=None, end=None):
+    """Aware bounds ``(from, until)`` covering the dates ``start`` to ``end``, inclusive."""
+    def day_start(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
+    return (
+        day_start(start) if start else None,
+        day_start(end + timedelta(days=1)) if end else None,
+    )
+
+
+def search_params(data):
+    """The non-empty ``TaskSearchForm`` fields of ``data``, e.g. for ``SavedFilter.params``."""
+    return {name: data.get(name) for name in TaskSearchForm.base_fields if data.get(name)}
+
+
+def filter_tasks(params, queryset=None):
+    """Apply the ``TaskSearchForm`` filters in ``params`` to ``queryset``.
+
+    This is the single definition of what a task search means; the board,
+    the JSON listing and anything else that accepts search parameters go
+    through it. Invalid parameters select all non-archived tasks.
+    """
+    if queryset is None:
+        queryset = task_queryset()
+
+    form = TaskSearchForm(params)
+    if not form.is_valid():
+        return queryset.filter(is_archived=False)
+
+    search_query = form.cleaned_data.get('search_query')
+    search_in = form.cleaned_data.get('search_in')
+    category = form.cleaned_data.get('category')
+    status = form.cleaned_data.get('status')
+    priority = form.cleaned_data.get('priority')
+    assigned_to = form.cleaned_data.get('assigned_to')
+    tag = form.cleaned_data.get('tag')
+    tag_match = form.cleaned_data.get('tag_match')
+    due_date_from = form.cleaned_data.get('due_date_from')
+    due_date_to = form.cleaned_data.get('due_date_to')
+    show_overdue = form.cleaned_data.get('show_overdue')
+    show_archived = form.cleaned_data.get('show_archived')
+
+    if not show_archived:
+        queryset = queryset.filter(is_archived=False)
+    if search_query:
+        queryset = search_tasks(queryset, search_query, search_in)
+
+    if category:
+        queryset = queryset.filter(category=category)
+    if status:
+        queryset = queryset.filter(status=status)
+    if priority:
+        queryset = queryset.filter(priority=priority)
+    if assigned_to:
+        queryset = queryset.filter(assigned_to=assigned_to)
+    if tag:
+        if tag_match == 'prefix':
+            # A range rather than startswith so the unique index on
+            # Tag.name is used; names are stored lowercase.
+            tag_filter = Q(tag__name__gte=tag, tag__name__lt=tag + '\uffff')
+        else:
+            tag_filter = Q(tag__name=tag)
+        queryset = queryset.filter(
+            pk__in=TaskTag.objects.filter(tag_filter).values('task')
+        )
+    due_from, due_until = day_range(due_date_from, due_date_to)
+    if due_from:
+        queryset = queryset.filter(due_date__gte=due_from)
+    if due_until:
+        queryset = queryset.filter(due_date__lt=due_until)
+    if show_overdue:
+        if 'is_overdue' in queryset.query.annotations:
+            # Same "now" as the annotation the cards render.
+            queryset = queryset.filter(is_overdue=True)
+        else:
+            queryset = queryset.overdue()
+
+    return queryset
@@ -1,8 +1,61 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
 from django.utils import timezone
+from . import lookups
 from .models import Member, Status, Task, Category, Priority, TaskComment
 
 
+class CachedChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in lookups.get_all(self.queryset.model):
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(lookups.get_all(self.queryset.model)) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(lookups.get_all(self.queryset.model))
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """A ModelChoiceField for the reference tables cached in ``lookups``.
+
+    Choices are rendered and submitted values are validated from the cache,
+    so the field never queries the database.
+    """
+    iterator = CachedChoiceIterator
+    # {pk: count} shown after each label, see TaskSearchForm.set_facets.
+    facet_counts = None
+
+    def label_from_instance(self, obj):
+        label = super().label_from_instance(obj)
+        if self.facet_counts is None:
+            return label
+        return f'{label} ({self.facet_counts.get(obj.pk, 0)})'
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        self.validate_no_null_characters(value)
+        model = self.queryset.model
+        if isinstance(value, model):
+            value = value.pk
+        try:
+            obj = lookups.get(model, model._meta.pk.to_python(value))
+        except ValidationError:
+            obj = None
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return obj
+
+
 class MemberForm(forms.ModelForm):
     class Meta:
         model = Member
@@ -85,6 +138,12 @@ class TaskForm(forms.ModelForm):
             'status', 'priority', 'due_date', 'estimated_hours', 
             'tags', 'is_archived'
         ]
+        field_classes = {
+            'category': CachedModelChoiceField,
+            'assigned_to': CachedModelChoiceField,
+            'status': CachedModelChoiceField,
+            'priority': CachedModelChoiceField,
+        }
         widgets = {
             'name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -160,8 +219,17 @@ class TaskCommentForm(forms.ModelForm):
         }
 
 
+class TaskAttachmentForm(forms.Form):
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control'}))
+    uploaded_by = CachedModelChoiceField(
+        queryset=Member.objects.all(),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+
 class TaskSearchForm(forms.Form):
     SEARCH_CHOICES = [
+        ('all', 'All Fields'),
         ('name', 'Task Name'),
         ('description', 'Description'),
         ('tags', 'Tags'),
@@ -178,38 +246,62 @@ class TaskSearchForm(forms.Form):
     
     search_in = forms.ChoiceField(
         choices=SEARCH_CHOICES,
+        required=False,
         initial='name',
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     
-    category = forms.ModelChoiceField(
+    category = CachedModelChoiceField(
         queryset=Category.objects.all(),
         required=False,
         empty_label="All Categories",
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     
-    status = forms.ModelChoiceField(
+    status = CachedModelChoiceField(
         queryset=Status.objects.all(),
         required=False,
         empty_label="All Statuses",
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     
-    priority = forms.ModelChoiceField(
+    priority = CachedModelChoiceField(
         queryset=Priority.objects.all(),
         required=False,
         empty_label="All Priorities",
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     
-    assigned_to = forms.ModelChoiceField(
+    assigned_to = CachedModelChoiceField(
         queryset=Member.objects.all(),
         required=False,
         empty_label="All Assignees",
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     
+    # Set by set_facets.
+    overdue_count = None
+    
+    TAG_MATCH_CHOICES = [
+        ('exact', 'Exact'),
+        ('prefix', 'Starts With'),
+    ]
+    
+    tag = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Tag'
+        })
+    )
+    
+    tag_match = forms.ChoiceField(
+        choices=TAG_MATCH_CHOICES,
+        required=False,
+        initial='exact',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    
     due_date_from = forms.DateField(
         required=False,
         widget=forms.DateInput(attrs={
@@ -236,4 +328,17 @@ class TaskSearchForm(forms.Form):
         required=False,
         initial=False,
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
-    )
\ No newline at end of file
+    )
+    
+    def clean_search_in(self):
+        # Optional, so API and export queries can filter without it.
+        return self.cleaned_data.get('search_in') or self.fields['search_in'].initial
+    
+    def clean_tag(self):
+        return self.cleaned_data.get('tag', '').strip().lower()
+    
+    def set_facets(self, facets):
+        """Show the counts from ``facets.get_facets`` next to the choices."""
+        for name in ('category', 'status', 'priority', 'assigned_to'):
+            self.fields[name].facet_counts = facets[name]
+        self.overdue_count = facets['overdue']
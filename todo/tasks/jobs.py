@@ -0,0 +1,218 @@
+"""
+Database-backed background jobs.
+
+Views ``enqueue`` a ``Job`` row and return at once; ``run_jobs`` worker
+processes claim queued jobs oldest first and run the handler registered for
+the job's ``kind``. Handlers work in chunks and report progress, which the
+``job_status`` view exposes. Claiming is a conditional ``UPDATE``, so any
+number of workers can share the queue with nothing but the database. A job
+whose worker stops sending heartbeats (the process died) is queued again.
+
+Each claim gives the job a new lease token, and progress and completion are
+only written while the token still matches. A worker that was merely slow
+and had its job requeued loses the lease: its next heartbeat raises
+``LeaseLost``, which stops the handler, and it never records a result over
+the new run's. Export files are removed ``TASK_EXPORT_TTL`` seconds after
+they are written by the attachment sweep.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import attachments, bulk
+from .filters import filter_tasks
+from .forms import TaskSearchForm
+from .models import Job, Priority, Status, Task
+from .transfer import FORMATS, export_rows, render_rows
+
+logger = logging.getLogger('tasks.jobs')
+
+# Running jobs without a heartbeat for this long are given to another worker.
+STALE_AFTER = getattr(settings, 'TASK_JOB_STALE_AFTER', 5 * 60)
+
+EXPORT_DIR = Path(getattr(settings, 'TASK_EXPORT_DIR', settings.BASE_DIR / 'exports'))
+
+# Finished exports can be downloaded for this long.
+EXPORT_TTL = getattr(settings, 'TASK_EXPORT_TTL', 7 * 24 * 60 * 60)
+
+HANDLERS = {}
+
+
+class LeaseLost(Exception):
+    """The job was requeued and possibly claimed by another worker."""
+
+
+def handler(kind):
+    """Register the decorated ``function(job)`` as the runner of ``kind`` jobs."""
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def enqueue(kind, params, user=None):
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    return Job.objects.create(kind=kind, params=params, created_by=user)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """Mark the oldest queued job as running for ``worker`` and return it."""
+    requeue_stale()
+    while True:
+        job = Job.objects.filter(status=Job.QUEUED).order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, lease=uuid.uuid4().hex, started_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # Another worker got it first; try the next one.
+
+
+def requeue_stale():
+    cutoff = timezone.now() - timedelta(seconds=STALE_AFTER)
+    return Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff).update(
+        status=Job.QUEUED, worker='', lease='', processed=0,
+    )
+
+
+def report_progress(job, processed, total=None):
+    """Record progress; also the heartbeat that keeps the job claimed.
+
+    Raises ``LeaseLost`` if the job is no longer ours.
+    """
+    job.processed = processed
+    changes = {'processed': processed, 'heartbeat_at': timezone.now()}
+    if total is not None:
+        job.total = changes['total'] = total
+    if not _leased(job).update(**changes):
+        raise LeaseLost(f'Job {job.pk} was requeued')
+
+
+def _leased(job):
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, lease=job.lease)
+
+
+def run(job):
+    try:
+        result = HANDLERS[job.kind](job)
+    except LeaseLost:
+        logger.warning('Job %s was requeued while running; stopped', job)
+        return job
+    except Exception:
+        logger.exception('Job %s failed', job)
+        finished = _leased(job).update(
+            status=Job.FAILED, error=traceback.format_exc(), finished_at=timezone.now(),
+        )
+        status = Job.FAILED
+    else:
+        finished = _leased(job).update(
+            status=Job.DONE, result=result, processed=job.total, finished_at=timezone.now(),
+        )
+        status = Job.DONE
+        job.result = result
+    if not finished:
+        logger.warning('Job %s was requeued while running; result discarded', job)
+        return job
+    job.status = status
+    return job
+
+
+def run_next(worker=None):
+    """Claim and run one job; returns it, or None when the queue is empty."""
+    job = claim(worker or worker_name())
+    return run(job) if job is not None else None
+
+
+def work(worker=None, poll_interval=1.0, stop=lambda: False):
+    """Run jobs until ``stop()`` returns true, sleeping while the queue is empty."""
+    worker = worker or worker_name()
+    while not stop():
+        close_old_connections()
+        if run_next(worker) is None:
+            time.sleep(poll_interval)
+
+
+# Handlers
+
+@handler('bulk_action')
+def run_bulk_action(job):
+    params = job.params
+    status = Status.objects.get(pk=params['status_id']) if params.get('status_id') else None
+    priority = Priority.objects.get(pk=params['priority_id']) if params.get('priority_id') else None
+    task_ids = params['task_ids']
+    report_progress(job, 0, len(task_ids))
+
+    changed = bulk.apply_action(
+        task_ids, params['action'], status=status, priority=priority,
+        progress=lambda done: report_progress(job, done),
+    )
+    return {'changed': changed}
+
+
+@handler('export')
+def run_export(job):
+    format = job.params.get('format', 'csv')
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format {format!r}')
+    filters = job.params.get('filters', {})
+    form = TaskSearchForm(filters)
+    if not form.is_valid():
+        # filter_tasks would export every task instead.
+        raise ValueError(f'Invalid filters: {form.errors.as_text()}')
+    queryset = filter_tasks(filters, queryset=Task.objects.all()).order_by('pk')
+    report_progress(job, 0, queryset.count())
+
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    # Named after the lease, so a requeued run never writes to this run's file.
+    file_name = f'tasks-{job.pk}-{job.lease}.{format}'
+    with open(EXPORT_DIR / file_name, 'w', newline='') as f:
+        f.writelines(render_rows(_counted(export_rows(queryset), job), format))
+    return {'file': file_name}
+
+
+def _counted(rows, job, every=1000):
+    for number, row in enumerate(rows, start=1):
+        yield row
+        if number % every == 0:
+            report_progress(job, number)
+
+
+def sweep_exports(ttl=EXPORT_TTL):
+    """Delete export files written more than ``ttl`` seconds ago; returns how many."""
+    if not EXPORT_DIR.exists():
+        return 0
+    cutoff = time.time() - ttl
+    removed = 0
+    for path in EXPORT_DIR.iterdir():
+        try:
+            expired = path.stat().st_mtime < cutoff
+        except FileNotFoundError:
+            continue
+        if expired:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+@handler('sweep_attachments')
+def run_attachment_sweep(job):
+    removed, freed = attachments.sweep(**job.params)
+    return {'removed': removed, 'freed_bytes': freed, 'exports_removed': sweep_exports()}
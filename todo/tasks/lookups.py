@@ -0,0 +1,98 @@
+"""
+Cached reference tables: statuses, priorities, categories and members.
+
+These tables are small, read on every board render and rarely written, so
+each is cached as a whole, in model ``Meta.ordering``, at two levels: a
+process-local copy and Django's shared cache. Each table has a version key in
+the shared cache; writes (see ``signals.py``) replace the version, which
+orphans the shared copy and makes every process reload its local copy. A
+process re-checks the version at most every ``LOOKUP_CACHE_LOCAL_TTL``
+seconds, so other processes see a change within that time and the process
+that made it sees it at once. With a cache that stores nothing
+(``DummyCache``) the versions are kept per process instead.
+
+The cached instances are shared between requests and must not be modified;
+copy them first.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Category, Member, Priority, Status
+
+MODELS = (Status, Priority, Category, Member)
+
+LOCAL_TTL = getattr(settings, 'LOOKUP_CACHE_LOCAL_TTL', 5)
+SHARED_TTL = getattr(settings, 'LOOKUP_CACHE_TTL', 24 * 60 * 60)
+
+# model label -> (version, checked at, objects, objects by pk)
+_local = {}
+# model label -> version, for caches that keep nothing (DummyCache)
+_local_versions = {}
+
+
+def _version_key(model):
+    return f'lookups:version:{model._meta.label_lower}'
+
+
+def _data_key(model, version):
+    return f'lookups:{model._meta.label_lower}:{version}'
+
+
+def _current_version(model):
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        # A fresh version makes any local copy from before the cache was
+        # cleared stale; add() keeps the first one if processes race.
+        cache.add(key, uuid.uuid4().hex, SHARED_TTL)
+        version = cache.get(key)
+    if version is None:
+        # The cache stores nothing; versions are then only per process.
+        version = _local_versions.setdefault(model._meta.label_lower, uuid.uuid4().hex)
+    return version
+
+
+def _entry(model):
+    label = model._meta.label_lower
+    entry = _local.get(label)
+    now = time.monotonic()
+    if entry is not None and now - entry[1] < LOCAL_TTL:
+        return entry
+
+    version = _current_version(model)
+    if entry is not None and entry[0] == version:
+        entry = (version, now, entry[2], entry[3])
+    else:
+        objects = cache.get(_data_key(model, version))
+        if objects is None:
+            objects = list(model.objects.all())
+            cache.set(_data_key(model, version), objects, SHARED_TTL)
+        entry = (version, now, objects, {obj.pk: obj for obj in objects})
+    _local[label] = entry
+    return entry
+
+
+def get_all(model):
+    """All rows of ``model`` in its default ordering."""
+    return list(_entry(model)[2])
+
+
+def get(model, pk):
+    """The row of ``model`` with primary key ``pk``, or None."""
+    return _entry(model)[3].get(pk)
+
+
+def version(*models):
+    """A string that changes whenever a row of ``models`` (default: all) changes."""
+    return '.'.join(_entry(model)[0] for model in models or MODELS)
+
+
+def invalidate(model=None):
+    """Drop the cached rows of ``model``, or of every cached model."""
+    for model in [model] if model else MODELS:
+        _local.pop(model._meta.label_lower, None)
+        _local_versions.pop(model._meta.label_lower, None)
+        cache.set(_version_key(model), uuid.uuid4().hex, SHARED_TTL)
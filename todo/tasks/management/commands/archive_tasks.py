@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from tasks import archive
+
+
+class Command(BaseCommand):
+    help = "Move archived and long-completed tasks, with their comments and attachments, to cold storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+        parser.add_argument('--limit', type=int, help='Stop after moving this many tasks')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tasks that would move')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f"{archive.archivable().count()} tasks would be archived")
+            return
+        moved = archive.archive_tasks(options['batch_size'], options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} tasks to cold storage"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import Task
+from tasks.transfer import FORMATS, export_rows, render_rows
+
+
+class Command(BaseCommand):
+    help = "Export tasks as CSV or JSON Lines, with related objects by name"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', help='Output file (default: stdout)')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the output file extension, else csv')
+        parser.add_argument('--exclude-archived', action='store_true', help='Skip archived tasks')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        output = options['output']
+        format = options['format'] or _format_from_path(output) or 'csv'
+
+        queryset = Task.objects.order_by('pk')
+        if options['exclude_archived']:
+            queryset = queryset.filter(is_archived=False)
+        lines = render_rows(export_rows(queryset, options['chunk_size']), format)
+
+        if output:
+            with open(output, 'w', newline='', encoding='utf-8') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
+
+
+def _format_from_path(path):
+    for format in FORMATS:
+        if path and path.endswith('.' + format):
+            return format
+    return None
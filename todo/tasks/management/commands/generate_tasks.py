@@ -0,0 +1,127 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from tasks.models import Category, Member, Priority, Status, Task, TaskAttachment, TaskComment
+from tasks.transfer import TaskImporter
+
+STATUSES = [
+    ('Backlog', False), ('To Do', False), ('In Progress', False),
+    ('Review', False), ('Blocked', False), ('Done', True),
+]
+PRIORITIES = [('Lowest', 1), ('Low', 2), ('Medium', 3), ('High', 4), ('Critical', 5)]
+WORDS = (
+    'deploy rotate audit refactor migrate investigate document review upgrade '
+    'database cache api frontend backend billing search login export import '
+    'report metrics alert queue worker index latency timeout memory incident'
+).split()
+TAGS = 'api web ops security infra ux bug feature perf docs data mobile'.split()
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic dataset (tasks, members, statuses, categories, comments, attachments)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000)
+        parser.add_argument('--members', type=int, default=50)
+        parser.add_argument('--categories', type=int, default=12)
+        parser.add_argument('--comments-per-task', type=float, default=3,
+                            help='Average number of comments per task')
+        parser.add_argument('--attachments-per-task', type=float, default=0.5,
+                            help='Average number of attachments per task')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        for order, (name, is_completed) in enumerate(STATUSES):
+            Status.objects.get_or_create(name=name, defaults={
+                'is_completed': is_completed, 'order': order,
+            })
+        for name, level in PRIORITIES:
+            if not Priority.objects.filter(level=level).exists():
+                Priority.objects.get_or_create(name=name, defaults={'level': level})
+        Member.objects.bulk_create(
+            [Member(name=f'Member {i}') for i in range(options['members'])],
+            ignore_conflicts=True,
+        )
+        Category.objects.bulk_create(
+            [Category(name=f'Category {i}') for i in range(options['categories'])],
+            ignore_conflicts=True,
+        )
+
+        statuses = dict(Status.objects.values_list('name', 'is_completed'))
+        priorities = list(Priority.objects.values_list('name', flat=True))
+        members = list(Member.objects.values_list('name', flat=True))
+        categories = list(Category.objects.values_list('name', flat=True))
+
+        first_new_pk = (Task.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        rows = (
+            self._task_row(rng, statuses, priorities, members, categories)
+            for _ in range(options['tasks'])
+        )
+        importer = TaskImporter(chunk_size=batch_size)
+        importer.run(rows)
+        self.stdout.write(f"Created {importer.created} tasks")
+
+        member_ids = list(Member.objects.values_list('pk', flat=True))
+        # Materialized first: the loop writes to tasks_task, which an open
+        # SQLite cursor over the same table may or may not see.
+        task_ids = list(Task.objects.filter(pk__gte=first_new_pk).order_by('pk').values_list('pk', flat=True))
+        comments = attachments = 0
+        for start in range(0, len(task_ids), batch_size):
+            chunk = task_ids[start:start + batch_size]
+            with transaction.atomic():
+                comments += len(TaskComment.objects.bulk_create([
+                    TaskComment(task_id=task_id, author_id=rng.choice(member_ids), content=self._sentence(rng, 20))
+                    for task_id in chunk
+                    for _ in range(self._count(rng, options['comments_per_task']))
+                ], batch_size=batch_size))
+                Task.objects.filter(pk__in=chunk).recount_comments()
+                attachments += len(TaskAttachment.objects.bulk_create([
+                    TaskAttachment(
+                        task_id=task_id,
+                        file_name=f'{rng.choice(WORDS)}.log',
+                        file_path=f'attachments/{task_id}/{i}.log',
+                        file_size=rng.randint(1_000, 50_000_000),
+                        uploaded_by_id=rng.choice(member_ids),
+                    )
+                    for task_id in chunk
+                    for i in range(self._count(rng, options['attachments_per_task']))
+                ], batch_size=batch_size))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {comments} comments and {attachments} attachments"
+        ))
+
+    def _task_row(self, rng, statuses, priorities, members, categories):
+        now = timezone.now()
+        created_at = now - timedelta(days=rng.uniform(0, 365))
+        status = rng.choice(list(statuses))
+        due_date = created_at + timedelta(days=rng.uniform(1, 60)) if rng.random() < 0.7 else None
+        completed_at = min(created_at + timedelta(days=rng.uniform(0, 30)), now) if statuses[status] else None
+        return {
+            'name': self._sentence(rng, rng.randint(2, 6)).capitalize(),
+            'description': self._sentence(rng, rng.randint(0, 60)),
+            'category': rng.choice(categories) if rng.random() < 0.9 else '',
+            'assigned_to': rng.choice(members) if rng.random() < 0.8 else '',
+            'status': status,
+            'priority': rng.choice(priorities),
+            'created_at': created_at.isoformat(),
+            'due_date': due_date.isoformat() if due_date else '',
+            'completed_at': completed_at.isoformat() if completed_at else '',
+            'estimated_hours': f'{rng.randint(1, 80) / 2:.1f}',
+            'tags': ', '.join(rng.sample(TAGS, rng.randint(0, 4))),
+            'is_archived': rng.random() < 0.2,
+        }
+
+    def _sentence(self, rng, words):
+        return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+    def _count(self, rng, average):
+        # Whole part always, fractional part with matching probability.
+        return int(average) + (rng.random() < average % 1)
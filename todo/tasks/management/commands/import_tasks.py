@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.transfer import FORMATS, TaskImporter, read_rows
+
+from .export_tasks import _format_from_path
+
+
+class Command(BaseCommand):
+    help = "Import tasks from a CSV or JSON Lines file produced by export_tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Input file')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the input file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['input']
+        format = options['format'] or _format_from_path(path)
+        if format is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format')
+
+        importer = TaskImporter(chunk_size=options['chunk_size'])
+        with open(path, newline='', encoding='utf-8') as f:
+            importer.run(read_rows(f, format))
+
+        for number, error in importer.errors:
+            self.stderr.write(f'Row {number} skipped: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.created} tasks ({len(importer.errors)} skipped)'
+        ))
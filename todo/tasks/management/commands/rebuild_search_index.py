@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from tasks import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to rebuild the index on (default: "default")',
+        )
+
+    def handle(self, *args, **options):
+        search.rebuild_index(options['database'])
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt"))
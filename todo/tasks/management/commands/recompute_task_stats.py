@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tasks import stats
+
+
+class Command(BaseCommand):
+    help = "Recount the cached task statistics from the database (run periodically to fix drift)"
+
+    def handle(self, *args, **options):
+        stats.recompute()
+        counts = stats.get_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Task statistics recomputed: {counts['total_tasks']} total, "
+            f"{counts['completed_tasks']} completed, {counts['overdue_tasks']} overdue"
+        ))
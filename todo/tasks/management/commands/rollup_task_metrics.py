@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import metrics
+
+
+class Command(BaseCommand):
+    help = "Roll up daily task metrics (run at least daily, e.g. from cron, to record open/overdue snapshots)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='Re-roll from this date (YYYY-MM-DD) instead of from the last rolled-up day')
+
+    def handle(self, *args, **options):
+        if options['since']:
+            start = options['since']
+            metrics.rollup(start)
+        else:
+            start = metrics.rollup_since_last()
+            if start is None:
+                raise CommandError("There are no tasks to roll up")
+        self.stdout.write(self.style.SUCCESS(f"Task metrics rolled up from {start}"))
@@ -0,0 +1,80 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from tasks.benchmarks import SCENARIOS, compare, run_benchmarks, run_contention, run_load
+
+
+class Command(BaseCommand):
+    help = "Benchmark the task views (run against a disposable database filled by generate_tasks)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[scenario.name for scenario in SCENARIOS],
+                            help='Only run this scenario (repeatable)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+        parser.add_argument('--load', action='append', metavar='PATH',
+                            help='Compare WSGI and ASGI throughput for this URL instead (repeatable)')
+        parser.add_argument('--contention', metavar='PATH',
+                            help='Measure reads of this URL mixed with concurrent status writes instead')
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Writer threads for --contention; --concurrency sets the readers')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['load']:
+            return self.handle_load(options)
+        if options['contention']:
+            return self.handle_contention(options)
+
+        results = run_benchmarks(options['iterations'], options['scenarios'])
+
+        self.stdout.write(f"{results['tasks']} tasks on {results['database']} at {results['commit']}")
+        self.stdout.write(f"{'scenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'peak KB':>10}  status")
+        for name, result in results['results'].items():
+            if 'error' in result:
+                self.stdout.write(self.style.ERROR(f"{name:<22}skipped: {result['error']}"))
+                continue
+            self.stdout.write(
+                f"{name:<22}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                f"{result['queries']:>9}{result['peak_memory_kb']:>10}  "
+                f"{','.join(map(str, result['status_codes']))}"
+            )
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+            self.stdout.write(f"\nCompared with {previous.get('commit')}:")
+            for name, metric, before, after, change in compare(previous, results):
+                self.stdout.write(f"{name:<22}{metric:<16}{before:>10} -> {after:<10}{change:+.1f}%")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def handle_load(self, options):
+        self.stdout.write(f"{'path':<22}{'server':<8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}  status")
+        for path in options['load']:
+            for server in ('wsgi', 'asgi'):
+                result = run_load(server, path, options['concurrency'], options['requests'])
+                self.stdout.write(
+                    f"{path:<22}{server:<8}{result['requests_per_second']:>9}"
+                    f"{result['p50_ms']:>10}{result['p95_ms']:>10}  "
+                    f"{','.join(map(str, result['status_codes']))}"
+                )
+
+    def handle_contention(self, options):
+        result = run_contention(
+            options['contention'], options['concurrency'], options['writers'], options['requests'],
+        )
+        self.stdout.write(f"{'side':<8}{'requests':>9}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        for side, values in result.items():
+            if values:
+                self.stdout.write(
+                    f"{side:<8}{values['requests']:>9}{values['requests_per_second']:>9}"
+                    f"{values['p50_ms']:>10}{values['p95_ms']:>10}{values['errors']:>8}"
+                )
@@ -0,0 +1,35 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from tasks import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs; start several processes to run jobs in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the queued jobs, then exit')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between checks of an empty queue')
+
+    def handle(self, *args, **options):
+        worker = jobs.worker_name()
+        if options['once']:
+            count = 0
+            while jobs.run_next(worker) is not None:
+                count += 1
+            self.stdout.write(self.style.SUCCESS(f"Ran {count} jobs"))
+            return
+
+        stopping = []
+
+        def stop(signum, frame):
+            # Finish the current job, then exit.
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.stdout.write(f"Worker {worker} waiting for jobs")
+        jobs.work(worker, options['poll_interval'], stop=lambda: bool(stopping))
+        self.stdout.write("Worker stopped")
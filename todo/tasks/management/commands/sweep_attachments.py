@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from tasks import attachments, jobs
+
+
+class Command(BaseCommand):
+    help = "Delete attachment blobs that no attachment refers to any more, and expired export files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=attachments.SWEEP_GRACE,
+                            help='Keep unreferenced blobs younger than this many seconds')
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Queue a sweep for the run_jobs workers instead of sweeping now')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = jobs.enqueue('sweep_attachments', {'grace': options['grace']})
+            self.stdout.write(f"Queued job {job.pk}")
+            return
+        removed, freed = attachments.sweep(options['grace'])
+        exports = jobs.sweep_exports()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} blobs ({freed} bytes) and {exports} export files"))
@@ -0,0 +1,156 @@
+"""
+Daily task metrics for trend charts.
+
+``rollup`` counts the tasks created and completed on each day of a date range
+and stores the totals in ``DailyTaskMetric``, overall and per status,
+priority and member. It also snapshots today's open and overdue counts, which
+cannot be reconstructed later. Run it regularly (the ``rollup_task_metrics``
+command re-rolls from the last rolled-up day); charts then read only the
+small rollup table through ``series``.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import lookups
+from .models import DailyTaskMetric, Member, Priority, Status, Task, TaskQuerySet
+
+# Dimension -> Task field it groups by (None for the overall totals).
+DIMENSIONS = {'total': None, 'status': 'status_id', 'priority': 'priority_id', 'member': 'assigned_to_id'}
+DIMENSION_MODELS = {'status': Status, 'priority': Priority, 'member': Member}
+
+COUNT_METRICS = ('created', 'completed')
+SNAPSHOT_METRICS = ('open', 'overdue')
+METRICS = COUNT_METRICS + SNAPSHOT_METRICS
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _spread(rows, values):
+    """Add ``values`` of each grouped row to every dimension it belongs to."""
+    for row in rows:
+        for dimension, field in DIMENSIONS.items():
+            key = (row['day'], dimension, (row[field] or 0) if field else 0)
+            totals = values[key]
+            for metric in METRICS:
+                if metric in row:
+                    totals[metric] += row[metric]
+
+
+def rollup(start, end=None):
+    """Recount the days ``start`` to ``end`` (default today), inclusive.
+
+    Safe to re-run over the same days. Today's open and overdue snapshot is
+    refreshed when ``end`` is today or later.
+    """
+    today = timezone.localdate()
+    end = end or today
+    start_at, end_at = _day_start(start), _day_start(end + timedelta(days=1))
+
+    counts = defaultdict(Counter)
+    for metric, field in (('created', 'created_at'), ('completed', 'completed_at')):
+        _spread(
+            Task.objects.filter(**{f'{field}__gte': start_at, f'{field}__lt': end_at})
+            .annotate(day=TruncDate(field))
+            .values('day', *filter(None, DIMENSIONS.values()))
+            .annotate(**{metric: Count('pk')})
+            .order_by(),
+            counts,
+        )
+
+    snapshot = end >= today
+    if snapshot:
+        now = timezone.now()
+        _spread(
+            (
+                {'day': today, **row}
+                for row in Task.objects.filter(is_archived=False)
+                .exclude(status__is_completed=True)
+                .values(*filter(None, DIMENSIONS.values()))
+                .annotate(open=Count('pk'), overdue=Count('pk', filter=TaskQuerySet.overdue_condition(now)))
+                .order_by()
+            ),
+            counts,
+        )
+
+    with transaction.atomic():
+        # Days can lose tasks (deletes, moved created_at), so start from zero.
+        DailyTaskMetric.objects.filter(date__range=(start, end)).update(created=0, completed=0)
+        if snapshot:
+            DailyTaskMetric.objects.filter(date=today).update(open=0, overdue=0)
+        snapshot_rows = {key: totals for key, totals in counts.items() if snapshot and key[0] == today}
+        _upsert({key: totals for key, totals in counts.items() if key not in snapshot_rows}, COUNT_METRICS)
+        _upsert(snapshot_rows, METRICS)
+
+
+def _upsert(values, metrics):
+    if not values:
+        return
+    DailyTaskMetric.objects.bulk_create(
+        [
+            DailyTaskMetric(date=day, dimension=dimension, key=key, **{
+                metric: totals[metric] for metric in metrics
+            })
+            for (day, dimension, key), totals in values.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['dimension', 'key', 'date'],
+        update_fields=list(metrics),
+        batch_size=1000,
+    )
+
+
+def rollup_since_last():
+    """Roll up from the day before the last rolled-up day, or from the first task."""
+    last = DailyTaskMetric.objects.aggregate(last=Max('date'))['last']
+    if last is not None:
+        start = last - timedelta(days=1)
+    else:
+        first = Task.objects.aggregate(first=Min('created_at'))['first']
+        if first is None:
+            return None
+        start = timezone.localdate(first)
+    rollup(start)
+    return start
+
+
+def series(metric, dimension='total', start=None, end=None):
+    """Daily values of ``metric`` per key of ``dimension``, one point per day.
+
+    Days without a rollup row count as 0 for created/completed and as None
+    (no snapshot) for open/overdue.
+    """
+    end = end or timezone.localdate()
+    start = start or end - timedelta(days=364)
+    default = 0 if metric in COUNT_METRICS else None
+
+    by_key = defaultdict(dict)
+    for key, day, value in DailyTaskMetric.objects.filter(
+        dimension=dimension, date__range=(start, end)
+    ).values_list('key', 'date', metric):
+        by_key[key][day] = value
+
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    return [
+        {
+            'key': key or None,
+            'label': _label(dimension, key),
+            'points': [[day.isoformat(), values.get(day, default)] for day in days],
+        }
+        for key, values in sorted(by_key.items())
+    ]
+
+
+def _label(dimension, key):
+    if dimension == 'total':
+        return 'All tasks'
+    if not key:
+        return 'Unassigned' if dimension == 'member' else 'None'
+    obj = lookups.get(DIMENSION_MODELS[dimension], key)
+    return obj.name if obj else f'Deleted #{key}'
@@ -0,0 +1,195 @@
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('tasks.profiler')
+
+DEFAULTS = {
+    # Defaults to settings.DEBUG.
+    'ENABLED': None,
+    # More queries than this in one request is reported.
+    'MAX_QUERIES': 50,
+    # The same statement run more than this many times with different
+    # parameters is reported as an N+1 pattern.
+    'MAX_REPEATS': 10,
+    # Raise QueryBudgetExceeded instead of logging a warning (for tests).
+    'RAISE': False,
+}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def get_config():
+    config = {**DEFAULTS, **getattr(settings, 'QUERY_PROFILER', {})}
+    if config['ENABLED'] is None:
+        config['ENABLED'] = settings.DEBUG
+    return config
+
+
+# The profile of the request being handled. Context variables follow the
+# request into sync_to_async and async_to_sync threads, so queries that
+# views run on worker threads are counted too.
+_current_profile = contextvars.ContextVar('query_profile', default=None)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_execute_wrapper(sender, connection, **kwargs):
+    _install(connection)
+
+
+def _install(connection):
+    # First in the list: execute_wrapper() context managers pop the last one.
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute_wrapper)
+
+
+class RequestProfile:
+    """Collects the queries run while installed as a connection execute wrapper."""
+
+    def __init__(self):
+        self.queries = []
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, repr(params), time.perf_counter() - start))
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    @property
+    def duplicate_count(self):
+        """Number of queries that repeated an earlier query exactly."""
+        return self.query_count - len({(sql, params) for sql, params, _ in self.queries})
+
+    def repeated_statements(self, threshold):
+        """Statements executed more than ``threshold`` times, most repeated first."""
+        counts = Counter(_normalize(sql) for sql, _, _ in self.queries)
+        return [(sql, count) for sql, count in counts.most_common() if count > threshold]
+
+
+def _normalize(sql):
+    # Collapse IN lists so the same lookup with different list lengths groups.
+    return re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', sql)
+
+
+class QueryProfilerMiddleware:
+    """Per-request query count, DB time, N+1 detection and template render time.
+
+    Queries on every database alias and thread the request uses are counted.
+    The numbers are logged as one JSON line on the ``tasks.profiler`` logger,
+    and sent as a ``Server-Timing`` header in ``DEBUG`` or to staff users;
+    requests over the limits in ``settings.QUERY_PROFILER`` are logged as
+    warnings, or raise ``QueryBudgetExceeded`` when ``RAISE`` is set.
+    Profiling is on by default only with ``DEBUG``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        profile, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        user = getattr(request, 'user', None)
+        return self._finish(request, response, profile, config, user)
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        profile, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        user = await request.auser() if hasattr(request, 'auser') else None
+        return self._finish(request, response, profile, config, user)
+
+    def _start(self, request):
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        profile = RequestProfile()
+        profile.start = time.perf_counter()
+        request.query_profile = profile
+        return profile, _current_profile.set(profile)
+
+    def _finish(self, request, response, profile, config, user):
+        total_time = time.perf_counter() - profile.start
+
+        if settings.DEBUG or getattr(user, 'is_staff', False):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={profile.db_time * 1000:.1f};desc="{profile.query_count} queries"',
+                f'tpl;dur={profile.template_time * 1000:.1f}',
+                f'total;dur={total_time * 1000:.1f}',
+            ])
+
+        repeated = profile.repeated_statements(config['MAX_REPEATS'])
+        over_budget = profile.query_count > config['MAX_QUERIES'] or repeated
+        record = {
+            'path': request.path,
+            'method': request.method,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'queries': profile.query_count,
+            'duplicates': profile.duplicate_count,
+            'db_ms': round(profile.db_time * 1000, 1),
+            'template_ms': round(profile.template_time * 1000, 1),
+            'total_ms': round(total_time * 1000, 1),
+            'repeated': [{'sql': sql[:200], 'count': count} for sql, count in repeated],
+        }
+        if over_budget and config['RAISE']:
+            raise QueryBudgetExceeded(json.dumps(record, indent=2))
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(record))
+        return response
+
+    def process_template_response(self, request, response):
+        profile = getattr(request, 'query_profile', None)
+        if profile is not None:
+            start = time.perf_counter()
+
+            def record_render_time(rendered):
+                profile.template_time += time.perf_counter() - start
+
+            response.add_post_render_callback(record_render_time)
+        return response
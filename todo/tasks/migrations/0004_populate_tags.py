@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+def split_tags(value):
+    names = []
+    for name in (value or '').split(','):
+        name = name.strip().lower()[:100]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def populate_tags(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Tag = apps.get_model('tasks', 'Tag')
+    TaskTag = apps.get_model('tasks', 'TaskTag')
+
+    task_tags = [
+        (task_id, split_tags(tags))
+        for task_id, tags in Task.objects.exclude(tags='').values_list('id', 'tags').iterator()
+    ]
+    names = {name for _, tag_names in task_tags for name in tag_names}
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.values_list('name', 'id'))
+
+    TaskTag.objects.bulk_create(
+        [
+            TaskTag(task_id=task_id, tag_id=tag_ids[name])
+            for task_id, tag_names in task_tags
+            for name in tag_names
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTaskMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('status', 'Status'), ('priority', 'Priority'), ('member', 'Member')], max_length=10)),
+                ('key', models.PositiveIntegerField(default=0, help_text='Primary key of the status, priority or member; 0 for none')),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('open', models.PositiveIntegerField(blank=True, null=True)),
+                ('overdue', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['completed_at'], name='task_completed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailytaskmetric',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key', 'date'), name='unique_daily_task_metric'),
+        ),
+    ]
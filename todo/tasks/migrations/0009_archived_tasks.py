@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTaskAttachment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('task_id', models.BigIntegerField(db_index=True)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_path', models.CharField(max_length=500)),
+                ('file_size', models.IntegerField(help_text='File size in bytes')),
+                ('uploaded_by_id', models.BigIntegerField()),
+                ('uploaded_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-uploaded_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTaskComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('task_id', models.BigIntegerField(db_index=True)),
+                ('author_id', models.BigIntegerField()),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('category_id', models.BigIntegerField(blank=True, null=True)),
+                ('assigned_to_id', models.BigIntegerField(blank=True, null=True)),
+                ('status_id', models.BigIntegerField(blank=True, null=True)),
+                ('priority_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('due_date', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('estimated_hours', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('actual_hours', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('tags', models.CharField(blank=True, max_length=500)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='archived_task_created_idx')],
+            },
+        ),
+    ]
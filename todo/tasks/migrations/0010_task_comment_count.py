@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def count_comments(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskComment = apps.get_model('tasks', 'TaskComment')
+    counts = (
+        TaskComment.objects.filter(task=OuterRef('pk'))
+        .order_by().values('task').annotate(total=Count('pk')).values('total')
+    )
+    Task.objects.filter(pk__in=TaskComment.objects.values('task')).update(comment_count=Subquery(counts))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_archived_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtask',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, help_text='Maintained by TaskComment.save() and delete()'),
+        ),
+        migrations.AddIndex(
+            model_name='taskattachment',
+            index=models.Index(fields=['task', '-uploaded_at', '-id'], name='attachment_task_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['task', '-created_at', '-id'], name='comment_task_created_idx'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop, hints={'model_name': 'task'}),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtaskattachment',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='archivedtaskattachment',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='taskattachment',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='taskattachment',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='Content hash; names the stored blob (see attachments.py)', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='archivedtaskattachment',
+            name='file_size',
+            field=models.BigIntegerField(help_text='File size in bytes'),
+        ),
+        migrations.AlterField(
+            model_name='taskattachment',
+            name='file_size',
+            field=models.BigIntegerField(help_text='File size in bytes'),
+        ),
+        migrations.AddIndex(
+            model_name='taskattachment',
+            index=models.Index(fields=['sha256'], name='attachment_sha256_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_saved_filters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['is_archived', 'status', 'priority', 'category', 'assigned_to', 'due_date'], name='task_facet_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_task_facet_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_archived_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_status_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_assignee_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_due_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_completed_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['-created_at'], name='task_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['status', '-created_at'], name='task_active_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['assigned_to', '-created_at'], name='task_active_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('due_date__isnull', False)), fields=['due_date'], name='task_due_set_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('completed_at__isnull', False)), fields=['completed_at'], name='task_completed_set_idx'),
+        ),
+    ]
@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import NotSupportedError, models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Coalesce
 
 
 class Category(models.Model):
@@ -57,6 +58,86 @@ class Status(models.Model):
         return self.name
 
 
+class Tag(models.Model):
+    name = models.CharField(max_length=100, unique=True, help_text="Lowercase tag name")
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class DaysUntil(models.Func):
+    """Whole days from ``now`` until a datetime, rounded down like ``timedelta.days``."""
+    output_field = models.IntegerField()
+
+    def __init__(self, expression, now, **extra):
+        super().__init__(expression, models.Value(now), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template='FLOOR(JULIANDAY(%(expressions)s))',
+            arg_joiner=') - JULIANDAY(', **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template='FLOOR(EXTRACT(EPOCH FROM (%(expressions)s)) / 86400)',
+            arg_joiner=' - ', **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        # TIMESTAMPDIFF(unit, start, end) takes the operands the other way round.
+        clone = self.copy()
+        clone.set_source_expressions(self.get_source_expressions()[::-1])
+        return clone.as_sql(
+            compiler, connection, template='FLOOR(TIMESTAMPDIFF(SECOND, %(expressions)s) / 86400)',
+            **extra_context
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):
+        if 'template' not in extra_context:
+            raise NotSupportedError(f'DaysUntil is not implemented for {connection.vendor}')
+        return super().as_sql(compiler, connection, **extra_context)
+
+
+class TaskQuerySet(models.QuerySet):
+    """Due-date logic in SQL, so filters, counts and cards agree on one "now"."""
+
+    @staticmethod
+    def overdue_condition(now=None):
+        # Tasks without a status are never overdue.
+        return models.Q(due_date__lt=now or timezone.now(), status__is_completed=False)
+
+    def overdue(self, now=None):
+        return self.filter(self.overdue_condition(now))
+
+    def recount_comments(self):
+        """Recompute ``comment_count``, e.g. after comments were bulk created."""
+        counts = (
+            TaskComment.objects.filter(task=models.OuterRef('pk'))
+            .order_by().values('task').annotate(total=models.Count('pk')).values('total')
+        )
+        return self.update(comment_count=Coalesce(models.Subquery(counts), 0))
+    
+    def with_due_dates(self, now=None):
+        """Annotate ``is_overdue`` and ``days_until_due`` as of ``now``.
+
+        Both can be filtered and ordered on like fields, and replace the
+        per-instance computation of the ``Task`` properties of the same name.
+        """
+        now = now or timezone.now()
+        return self.annotate(
+            is_overdue=models.Case(
+                models.When(self.overdue_condition(now), then=True),
+                default=False,
+                output_field=models.BooleanField(),
+            ),
+            days_until_due=DaysUntil('due_date', now),
+        )
+
+
 class Task(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -75,33 +156,127 @@ class Task(models.Model):
     estimated_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     actual_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     tags = models.CharField(max_length=500, blank=True, help_text="Comma-separated tags")
+    tag_set = models.ManyToManyField(Tag, through='TaskTag', related_name='tasks', blank=True)
     is_archived = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=0, help_text="Incremented on every write, for optimistic concurrency")
+    comment_count = models.PositiveIntegerField(default=0, help_text="Maintained by TaskComment.save() and delete()")
+    
+    objects = TaskQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Board and list queries: active tasks, newest first, optionally
+            # narrowed to one status or assignee. Partial, so archived tasks
+            # waiting for cold storage take no space in them.
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_archived=False),
+                name='task_active_created_idx',
+            ),
+            models.Index(
+                fields=['status', '-created_at'], condition=models.Q(is_archived=False),
+                name='task_active_status_idx',
+            ),
+            models.Index(
+                fields=['assigned_to', '-created_at'], condition=models.Q(is_archived=False),
+                name='task_active_assignee_idx',
+            ),
+            # Dashboard "recent tasks" across archived and active tasks.
+            models.Index(fields=['-created_at'], name='task_created_idx'),
+            # Overdue and upcoming-deadline queries. Any comparison on the
+            # column implies IS NOT NULL, so tasks without one are left out.
+            models.Index(
+                fields=['due_date'], condition=models.Q(due_date__isnull=False),
+                name='task_due_set_idx',
+            ),
+            # Daily metrics rollups of completions; open tasks are left out.
+            models.Index(
+                fields=['completed_at'], condition=models.Q(completed_at__isnull=False),
+                name='task_completed_set_idx',
+            ),
+            # Latest change, for conditional GET validators.
+            models.Index(fields=['updated_at'], name='task_updated_idx'),
+            # Search form facet counts, grouped by all four choices.
+            models.Index(
+                fields=['is_archived', 'status', 'priority', 'category', 'assigned_to', 'due_date'],
+                name='task_facet_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        """Save, bumping ``version``.
+
+        A plain ``save()`` of a loaded task updates every field except
+        ``comment_count``, which changes with F() updates behind this
+        instance's back; writing back the loaded value would undo them.
+        Such a save is an UPDATE only: if the row was deleted meanwhile it
+        raises ``DatabaseError`` instead of inserting the task again.
+        """
+        self.version += 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comment_count'
+            ]
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def parse_tags(value):
+        """Split a comma-separated tag string into unique, lowercase names."""
+        names = []
+        for name in (value or '').split(','):
+            name = name.strip().lower()[:100]
+            if name and name not in names:
+                names.append(name)
+        return names
+    
+    @property
+    def tag_names(self):
+        # Uses the prefetched tag_set when available.
+        return [tag.name for tag in self.tag_set.all()]
+    
+    def sync_tags(self):
+        """Make tag_set match the comma-separated ``tags`` string."""
+        names = self.parse_tags(self.tags)
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        self.tag_set.set(Tag.objects.filter(name__in=names))
+    
+    # is_overdue and days_until_due are usually annotated by
+    # TaskQuerySet.with_due_dates(); they are computed here otherwise.
+    
     @property
     def is_overdue(self):
-        if self.due_date and not self.status.is_completed if self.status else False:
-            return timezone.now() > self.due_date
-        return False
+        if '_is_overdue' in self.__dict__:
+            return self._is_overdue
+        return bool(
+            self.due_date and self.status and not self.status.is_completed
+            and self.due_date < timezone.now()
+        )
+    
+    @is_overdue.setter
+    def is_overdue(self, value):
+        self._is_overdue = value
     
     @property
     def days_until_due(self):
-        if self.due_date:
-            delta = self.due_date - timezone.now()
-            return delta.days
-        return None
+        if '_days_until_due' in self.__dict__:
+            return self._days_until_due
+        return (self.due_date - timezone.now()).days if self.due_date else None
+    
+    @days_until_due.setter
+    def days_until_due(self, value):
+        self._days_until_due = value
     
     @property
     def days_until_due_abs(self):
-        if self.due_date:
-            delta = self.due_date - timezone.now()
-            return abs(delta.days)
-        return None
+        days = self.days_until_due
+        return abs(days) if days is not None else None
     
     def mark_completed(self):
         if self.status and self.status.is_completed:
@@ -109,6 +284,19 @@ class Task(models.Model):
             self.save()
 
 
+class TaskTag(models.Model):
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='task_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='task_tags')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'task'], name='unique_task_tag'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task.name}: {self.tag.name}"
+
+
 class TaskComment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='comments')
@@ -118,21 +306,213 @@ class TaskComment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Task detail pages list comments newest first, a page at a time.
+            models.Index(fields=['task', '-created_at', '-id'], name='comment_task_created_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.author.name} on {self.task.name}"
+    
+    # Only single comments are counted here. Deleting the task removes its
+    # comments without either method; bulk creates call recount_comments(),
+    # and so does deleting a member (see signals.py), which cascades to
+    # their comments.
+    
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        if created:
+            Task.objects.filter(pk=self.task_id).update(comment_count=models.F('comment_count') + 1)
+    
+    def delete(self, *args, **kwargs):
+        task_id = self.task_id
+        result = super().delete(*args, **kwargs)
+        Task.objects.filter(pk=task_id).update(comment_count=models.F('comment_count') - 1)
+        return result
 
 
 class TaskAttachment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attachments')
     file_name = models.CharField(max_length=255)
     file_path = models.CharField(max_length=500)
-    file_size = models.IntegerField(help_text="File size in bytes")
+    file_size = models.BigIntegerField(help_text="File size in bytes")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Content hash; names the stored blob (see attachments.py)")
+    content_type = models.CharField(max_length=100, blank=True)
     uploaded_by = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='uploads')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['task', '-uploaded_at', '-id'], name='attachment_task_uploaded_idx'),
+            # Blob reference checks by the attachment sweeper.
+            models.Index(fields=['sha256'], name='attachment_sha256_idx'),
+        ]
+    
+    def __str__(self):
+        return self.file_name
+
+
+class DailyTaskMetric(models.Model):
+    """Per-day task counts, rolled up by ``metrics.rollup`` for trend charts.
+
+    ``created`` and ``completed`` count the tasks created and completed that
+    day. ``open`` and ``overdue`` are snapshots taken when the day was last
+    rolled up, so they are only recorded for days rolled up while current.
+    """
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('status', 'Status'),
+        ('priority', 'Priority'),
+        ('member', 'Member'),
+    ]
+    
+    date = models.DateField()
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    key = models.PositiveIntegerField(default=0, help_text="Primary key of the status, priority or member; 0 for none")
+    created = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    open = models.PositiveIntegerField(null=True, blank=True)
+    overdue = models.PositiveIntegerField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key', 'date'], name='unique_daily_task_metric'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.dimension} {self.key}"
+
+
+class SavedFilter(models.Model):
+    """A named ``TaskSearchForm`` query of one user; see ``saved_filters.py``."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_filters')
+    name = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, help_text="TaskSearchForm data")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_saved_filter_name'),
+        ]
+    
+    def __str__(self):
+        return self.name
+
+
+class Job(models.Model):
+    """A queued background operation, run by the ``run_jobs`` worker command."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    worker = models.CharField(max_length=100, blank=True)
+    # Changed on every claim; a worker only writes to the job while it holds the lease.
+    lease = models.CharField(max_length=32, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Workers claim the oldest queued job.
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+    
+    @property
+    def progress(self):
+        if self.status == self.DONE:
+            return 1.0
+        return self.processed / self.total if self.total else 0.0
+
+
+class ArchivedTask(models.Model):
+    """A task moved out of ``tasks_task`` into cold storage by ``archive.archive_tasks``.
+
+    The original primary key is kept. Categories, members, statuses and
+    priorities are referenced by id only, so the cold tables can live in a
+    separate database (see ``routers.ArchiveRouter``).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    category_id = models.BigIntegerField(null=True, blank=True)
+    assigned_to_id = models.BigIntegerField(null=True, blank=True)
+    status_id = models.BigIntegerField(null=True, blank=True)
+    priority_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    due_date = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    estimated_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    actual_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    tags = models.CharField(max_length=500, blank=True)
+    version = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='archived_task_created_idx'),
+        ]
+    
+    def __str__(self):
+        return self.name
+
+
+class ArchivedTaskComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    task_id = models.BigIntegerField(db_index=True)
+    author_id = models.BigIntegerField()
+    content = models.TextField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Archived comment on task {self.task_id}"
+
+
+class ArchivedTaskAttachment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    task_id = models.BigIntegerField(db_index=True)
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500)
+    file_size = models.BigIntegerField(help_text="File size in bytes")
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    uploaded_by_id = models.BigIntegerField()
+    uploaded_at = models.DateTimeField()
+    
     class Meta:
         ordering = ['-uploaded_at']
     
     def __str__(self):
-        return self.file_name
\ No newline at end of file
+        return self.file_name
@@ -0,0 +1,113 @@
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .bulk import TaskState
+from .models import Status, Task
+from .signals import tasks_changed
+
+MAX_MOVES = 500
+
+
+class Move(NamedTuple):
+    task_id: int
+    status_id: int
+    # The Task.version the client last saw, or None to skip the check.
+    version: int = None
+
+
+class UnknownStatus(ValueError):
+    """A move targets a status that does not exist; the request is invalid, not stale."""
+
+
+class MoveResult(NamedTuple):
+    task_id: int
+    name: str
+    status: Status
+    version: int
+
+
+class MoveConflict(NamedTuple):
+    task_id: int
+    error: str
+    # The current version, so the client can refresh the card.
+    version: int = None
+
+
+def apply_moves(moves):
+    """Move tasks between kanban columns in one transaction.
+
+    All moves into the same status are written with a single ``UPDATE``
+    that also bumps ``version``, refreshes ``updated_at`` and, for completed
+    statuses, sets ``completed_at``. A move whose ``version`` does not match
+    the stored one is rejected as stale and reported in the conflicts; the
+    other moves still apply. A move to the task's current status changes
+    nothing and reports the current version. When a task is moved more than
+    once in the batch, only the last move counts. Committed moves send
+    ``signals.tasks_changed`` like a bulk ``change_status``.
+
+    Returns ``(results, conflicts)``. Raises ``UnknownStatus``, moving
+    nothing, if any move targets a status that does not exist.
+    """
+    latest = {}
+    for move in moves:
+        latest[move.task_id] = move
+    moves = list(latest.values())
+
+    statuses = Status.objects.in_bulk({move.status_id for move in moves})
+    unknown = sorted({move.status_id for move in moves} - set(statuses))
+    if unknown:
+        raise UnknownStatus(f'Status not found: {", ".join(map(str, unknown))}')
+
+    results = []
+    conflicts = []
+    with transaction.atomic():
+        current = {}
+        for name, *values in (
+            Task.objects.select_for_update()
+            .filter(pk__in=latest)
+            .values_list('name', 'pk', 'status_id', 'priority_id', 'version')
+        ):
+            state = TaskState(*values)
+            current[state.id] = (name, state)
+
+        by_status = defaultdict(list)
+        for move in moves:
+            if move.task_id not in current:
+                conflicts.append(MoveConflict(move.task_id, 'Task not found'))
+                continue
+            name, state = current[move.task_id]
+            if move.version is not None and move.version != state.version:
+                conflicts.append(MoveConflict(move.task_id, 'Task was changed by someone else', state.version))
+            elif move.status_id == state.status_id:
+                # Already there; nothing to write.
+                results.append(MoveResult(move.task_id, name, statuses[move.status_id], state.version))
+            else:
+                by_status[move.status_id].append(move.task_id)
+
+        now = timezone.now()
+        before = []
+        after = []
+        for status_id, task_ids in by_status.items():
+            status = statuses[status_id]
+            changes = {'status': status, 'version': F('version') + 1, 'updated_at': now}
+            if status.is_completed:
+                changes['completed_at'] = now
+            Task.objects.filter(pk__in=task_ids).update(**changes)
+
+            for task_id in task_ids:
+                name, state = current[task_id]
+                moved = state._replace(status_id=status_id, version=state.version + 1)
+                results.append(MoveResult(task_id, name, status, moved.version))
+                before.append(state)
+                after.append(moved)
+
+        if before:
+            # The same fan-out (stats, saved filters, live boards) as bulk changes.
+            transaction.on_commit(lambda: tasks_changed.send(
+                sender=Task, action='change_status', before=before, after=after,
+            ))
+    return results, conflicts
@@ -0,0 +1,139 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a ``WHERE (ordering columns) > (last row seen)``
+condition instead of ``OFFSET``, so every page costs the same no matter how
+deep it is, and the ordering index is used directly. The ordering must end
+in a unique, non-null column (``id``) so that positions are unambiguous,
+and none of the ordering columns may be NULL.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+APPROXIMATE_COUNT_LIMIT = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor,
+                 previous_cursor, count=None, count_is_exact=True):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_is_exact = count_is_exact
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class CursorPaginator:
+    """Paginate ``queryset`` by ``ordering`` using opaque cursors.
+
+    ``count`` is ``None`` (no count), ``'exact'`` or ``'approximate'``. The
+    approximate count stops counting at ``APPROXIMATE_COUNT_LIMIT`` rows and
+    reports ``count_is_exact=False`` when it got there.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), count=None):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self.count_mode = count
+
+    def page(self, cursor=None):
+        position, backwards = self.decode_cursor(cursor) if cursor else (None, False)
+
+        queryset = self.queryset
+        if backwards:
+            queryset = queryset.reverse()
+        if position is not None:
+            queryset = queryset.filter(self._after(position, backwards))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        count, count_is_exact = self.count()
+        return CursorPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0], backwards=True) if has_previous and rows else None,
+            count=count,
+            count_is_exact=count_is_exact,
+        )
+
+    def count(self):
+        if self.count_mode == 'exact':
+            return self.queryset.count(), True
+        if self.count_mode == 'approximate':
+            count = self.queryset[:APPROXIMATE_COUNT_LIMIT].count()
+            return count, count < APPROXIMATE_COUNT_LIMIT
+        return None, True
+
+    def encode_cursor(self, obj, backwards=False):
+        values = []
+        for name, _ in self.ordering:
+            field = self._field_for(name)
+            values.append(field.value_to_string(obj) if field else getattr(obj, name))
+        payload = json.dumps({'p': values, 'b': backwards}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise InvalidCursor(cursor)
+            position = []
+            for (name, _), value in zip(self.ordering, values):
+                field = self._field_for(name)
+                position.append(field.to_python(value) if field else value)
+            return position, bool(payload.get('b'))
+        except (ValueError, KeyError, TypeError, ValidationError) as e:
+            raise InvalidCursor(cursor) from e
+
+    def _field_for(self, name):
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # An annotation such as search_rank; stored as plain JSON.
+            return None
+
+    def _after(self, position, backwards):
+        """Rows strictly after ``position`` in (possibly reversed) ordering."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, position):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        # Repeat the bound on the leading column on its own so the database
+        # can seek into the ordering index instead of filtering from its start.
+        (name, descending), value = self.ordering[0], position[0]
+        lookup = 'lte' if descending != backwards else 'gte'
+        return Q(**{f'{name}__{lookup}': value}) & condition
@@ -0,0 +1,37 @@
+from django.conf import settings
+
+ARCHIVE_MODELS = {'archivedtask', 'archivedtaskcomment', 'archivedtaskattachment'}
+
+
+def archive_database():
+    return getattr(settings, 'TASK_ARCHIVE_DATABASE', 'default')
+
+
+class ArchiveRouter:
+    """Keep the cold archive tables in ``settings.TASK_ARCHIVE_DATABASE``.
+
+    With the default of ``'default'`` everything stays in one database.
+    Pointing it at another alias (say a second SQLite file) moves the cold
+    tables there; create them with ``migrate --database <alias>``.
+    """
+
+    def _is_archive(self, app_label, model_name):
+        return app_label == 'tasks' and model_name in ARCHIVE_MODELS
+
+    def db_for_read(self, model, **hints):
+        if self._is_archive(model._meta.app_label, model._meta.model_name):
+            return archive_database()
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        archive = archive_database()
+        if archive == 'default':
+            return None
+        if self._is_archive(app_label, model_name):
+            return db == archive
+        # Nothing else belongs in a separate archive database, including
+        # RunPython and RunSQL operations without a model_name hint (the
+        # search index triggers, data migrations).
+        return db != archive
@@ -0,0 +1,141 @@
+"""
+Cached result sets of saved filters.
+
+A ``SavedFilter`` stores ``TaskSearchForm`` data. The ids of the tasks it
+matches are cached by ``task_ids`` so that opening a saved view is one
+cache read, and kept current from the task write paths (see
+``signals.py``): ``record_changes`` runs the cached filters through
+``filters.filter_tasks`` again, restricted to the changed tasks, and adds
+or drops them. The filters are checked together, ``UNION_SIZE`` to a
+query, so a write costs one query for up to that many cached filters
+rather than one per filter. ``filter_tasks`` stays the only definition
+of what a filter matches.
+
+Writes to the reference tables can change what any filter matches without
+touching a task, so they replace the generation key, which orphans every
+cached set. Sets are recomputed at least every
+``TASK_SAVED_FILTER_RECOMPUTE_INTERVAL`` seconds, which corrects drift from
+concurrent updates of the same set, and overdue filters, which depend on
+the current time, every ``TASK_SAVED_FILTER_OVERDUE_TTL`` seconds. Filters
+matching more than ``TASK_SAVED_FILTER_MAX_IDS`` tasks are not cached; they
+are run as an ordinary search.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import IntegerField, Value
+
+from .filters import filter_tasks
+from .forms import TaskSearchForm
+from .models import SavedFilter, Task
+
+RECOMPUTE_INTERVAL = getattr(settings, 'TASK_SAVED_FILTER_RECOMPUTE_INTERVAL', 10 * 60)
+OVERDUE_TTL = getattr(settings, 'TASK_SAVED_FILTER_OVERDUE_TTL', 60)
+MAX_IDS = getattr(settings, 'TASK_SAVED_FILTER_MAX_IDS', 5000)
+# Cached filters checked per query by record_changes; SQLite allows 500
+# terms in a compound SELECT.
+UNION_SIZE = 100
+
+GENERATION_KEY = 'saved_filters:generation'
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _key(generation, pk):
+    return f'saved_filters:{generation}:{pk}'
+
+
+def _ttl(params):
+    form = TaskSearchForm(params)
+    if form.is_valid() and form.cleaned_data.get('show_overdue'):
+        return OVERDUE_TTL
+    return RECOMPUTE_INTERVAL
+
+
+def _matching(params, task_ids=None):
+    queryset = Task.objects.all() if task_ids is None else Task.objects.filter(pk__in=task_ids)
+    return filter_tasks(params, queryset).order_by().values_list('pk', flat=True)
+
+
+def _matching_each(params_list, task_ids):
+    """The ids among ``task_ids`` each of ``params_list`` matches, as a list of sets.
+
+    The filters are run as one ``UNION ALL`` per ``UNION_SIZE`` of them,
+    each branch tagged with its position in ``params_list``.
+    """
+    matches = [set() for _ in params_list]
+    queryset = Task.objects.filter(pk__in=task_ids)
+    for start in range(0, len(params_list), UNION_SIZE):
+        branches = [
+            filter_tasks(params, queryset).order_by()
+            .annotate(saved_filter_index=Value(index, output_field=IntegerField()))
+            .values_list('saved_filter_index', 'pk')
+            for index, params in enumerate(params_list[start:start + UNION_SIZE], start)
+        ]
+        for index, pk in branches[0].union(*branches[1:], all=True):
+            matches[index].add(pk)
+    return matches
+
+
+def task_ids(saved_filter):
+    """The ids of the tasks ``saved_filter`` matches, or None if there are too many to cache."""
+    key = _key(_generation(), saved_filter.pk)
+    entry = cache.get(key)
+    if entry is not None and entry['params'] == saved_filter.params:
+        return entry['ids']
+
+    ids = frozenset(_matching(saved_filter.params)[:MAX_IDS + 1])
+    ttl = _ttl(saved_filter.params)
+    entry = {
+        'params': saved_filter.params,
+        'ids': ids if len(ids) <= MAX_IDS else None,
+        'expires': time.time() + ttl,
+    }
+    cache.set(key, entry, ttl)
+    return entry['ids']
+
+
+def record_changes(task_ids, deleted=False):
+    """Update the cached sets after the tasks with ``task_ids`` were written or deleted.
+
+    Call after the write has committed.
+    """
+    task_ids = set(task_ids)
+    if not task_ids:
+        return
+    generation = _generation()
+    keys = [_key(generation, pk) for pk in SavedFilter.objects.values_list('pk', flat=True)]
+    now = time.time()
+    entries = [
+        (key, entry) for key, entry in cache.get_many(keys).items()
+        if entry['ids'] is not None and entry['expires'] > now
+    ]
+    if deleted:
+        matches = [set()] * len(entries)
+    else:
+        matches = _matching_each([entry['params'] for _, entry in entries], task_ids)
+    for (key, entry), matched in zip(entries, matches):
+        ids = (entry['ids'] - task_ids) | matched
+        if ids == entry['ids']:
+            continue
+        if len(ids) > MAX_IDS:
+            cache.delete(key)
+        else:
+            cache.set(key, {**entry, 'ids': frozenset(ids)}, entry['expires'] - now)
+
+
+def invalidate():
+    """Drop every cached set; they are recomputed as they are read."""
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+def forget(saved_filter):
+    cache.delete(_key(_generation(), saved_filter.pk))
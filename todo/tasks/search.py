@@ -0,0 +1,159 @@
+"""
+Full-text search over task name, description and tags.
+
+On SQLite the text lives in the ``tasks_task_fts`` FTS5 table (external
+content, kept in sync by triggers); on PostgreSQL in the generated, GIN
+indexed ``tasks_task.search_vector`` column. Both are created by migration
+``0002_task_search_index``. Other backends fall back to ``icontains``.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Member
+
+SEARCH_FIELDS = ('name', 'description', 'tags')
+
+# Relative weight of a hit in each field when ranking results.
+FIELD_WEIGHTS = {'name': 10.0, 'description': 1.0, 'tags': 5.0}
+POSTGRES_WEIGHT_LABELS = {'name': 'A', 'description': 'B', 'tags': 'C'}
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_insert AFTER INSERT ON tasks_task BEGIN
+        INSERT INTO tasks_task_fts(rowid, name, description, tags)
+        VALUES (new.id, new.name, new.description, new.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_delete AFTER DELETE ON tasks_task BEGIN
+        INSERT INTO tasks_task_fts(tasks_task_fts, rowid, name, description, tags)
+        VALUES ('delete', old.id, old.name, old.description, old.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_update
+    AFTER UPDATE OF name, description, tags ON tasks_task BEGIN
+        INSERT INTO tasks_task_fts(tasks_task_fts, rowid, name, description, tags)
+        VALUES ('delete', old.id, old.name, old.description, old.tags);
+        INSERT INTO tasks_task_fts(rowid, name, description, tags)
+        VALUES (new.id, new.name, new.description, new.tags);
+    END
+    """,
+]
+
+
+def search_tasks(queryset, query, field='all'):
+    """Filter ``queryset`` to tasks matching ``query``.
+
+    ``field`` is one of ``SEARCH_FIELDS``, ``'assigned_to'`` or ``'all'``.
+    Full-text matches are annotated with ``search_rank`` (higher is better).
+    Every word of the query must match, as a prefix.
+    """
+    if field == 'assigned_to':
+        return queryset.filter(assigned_to__name__icontains=query)
+
+    fields = SEARCH_FIELDS if field == 'all' else (field,)
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        match, rank = _sqlite_expressions(terms, fields)
+    elif vendor == 'postgresql':
+        match, rank = _postgres_expressions(terms, fields)
+    else:
+        match = Q()
+        for term in terms:
+            match &= Q(*[Q(**{f'{name}__icontains': term}) for name in fields], _connector=Q.OR)
+        rank = None
+
+    condition = match
+    if field == 'all':
+        # Assignee names live in another table and are matched separately.
+        condition = match | Q(assigned_to__in=Member.objects.filter(name__icontains=query))
+    if rank is not None:
+        queryset = queryset.annotate(search_rank=rank)
+    return queryset.filter(condition)
+
+
+def rank_ordering(queryset):
+    """Ordering that puts the best full-text matches first, if ranked."""
+    if 'search_rank' in queryset.query.annotations:
+        return ['-search_rank', '-created_at', '-id']
+    return ['-created_at', '-id']
+
+
+def _sqlite_expressions(terms, fields):
+    phrase = ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+    if fields != SEARCH_FIELDS:
+        phrase = '{%s} : (%s)' % (' '.join(fields), phrase)
+    weights = ', '.join(str(FIELD_WEIGHTS[name]) for name in SEARCH_FIELDS)
+    match = Q(pk__in=RawSQL(
+        'SELECT rowid FROM tasks_task_fts WHERE tasks_task_fts MATCH %s',
+        [phrase],
+    ))
+    # bm25() is lower for better matches, so negate it. Tasks matched only
+    # by assignee name rank 0 rather than NULL so the rank stays comparable.
+    # The ranked matches are a MATERIALIZED CTE, which SQLite computes once
+    # per statement and reads through an automatic index on rowid, so MATCH
+    # runs once however often the rank is used: in the page query, and in
+    # the board's window ordering, where a plain derived table would be
+    # re-run as a co-routine for every row.
+    rank = RawSQL(
+        'COALESCE((WITH ranked AS MATERIALIZED ('
+        f'SELECT rowid, -bm25(tasks_task_fts, {weights}) AS rank FROM tasks_task_fts '
+        'WHERE tasks_task_fts MATCH %s'
+        ') SELECT ranked.rank FROM ranked WHERE ranked.rowid = tasks_task.id), 0)',
+        [phrase],
+        output_field=FloatField(),
+    )
+    return match, rank
+
+
+def _postgres_expressions(terms, fields):
+    labels = ''
+    if fields != SEARCH_FIELDS:
+        labels = ''.join(POSTGRES_WEIGHT_LABELS[name] for name in fields)
+    tsquery = ' & '.join(f'{term}:*{labels}' for term in terms)
+    match = RawSQL(
+        "tasks_task.search_vector @@ to_tsquery('english', %s)",
+        [tsquery],
+        output_field=BooleanField(),
+    )
+    # ts_rank takes the weights of labels {D, C, B, A}, scaled to 0..1.
+    top = max(FIELD_WEIGHTS.values())
+    weights = [0.0] + [
+        FIELD_WEIGHTS[name] / top for name in reversed(SEARCH_FIELDS)
+    ]
+    rank = RawSQL(
+        "ts_rank(%s::float4[], tasks_task.search_vector, to_tsquery('english', %s))",
+        [weights, tsquery],
+        output_field=FloatField(),
+    )
+    return Q(match), rank
+
+
+def ensure_index(using='default'):
+    """Install the SQLite sync triggers if they are missing."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for sql in SQLITE_TRIGGERS:
+            cursor.execute(sql)
+
+
+def rebuild_index(using='default'):
+    """Rebuild the full-text index from the task table."""
+    connection = connections[using]
+    ensure_index(using)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("INSERT INTO tasks_task_fts(tasks_task_fts) VALUES('rebuild')")
+            cursor.execute("INSERT INTO tasks_task_fts(tasks_task_fts) VALUES('optimize')")
+        elif connection.vendor == 'postgresql':
+            cursor.execute('REINDEX INDEX tasks_task_search_vector_idx')
@@ -0,0 +1,56 @@
+def serialize_task(task):
+    """JSON-ready dict of a task, with related objects resolved by name.
+
+    Expects ``category``, ``assigned_to``, ``status`` and ``priority`` to be
+    selected and ``tag_set`` to be prefetched (see ``filters.task_queryset``).
+    """
+    return {
+        'id': task.pk,
+        'name': task.name,
+        'description': task.description,
+        'category': task.category.name if task.category else None,
+        'assigned_to': task.assigned_to.name if task.assigned_to else None,
+        'status': task.status.name if task.status else None,
+        'priority': task.priority.name if task.priority else None,
+        'created_at': _isoformat(task.created_at),
+        'updated_at': _isoformat(task.updated_at),
+        'due_date': _isoformat(task.due_date),
+        'completed_at': _isoformat(task.completed_at),
+        'estimated_hours': _decimal(task.estimated_hours),
+        'actual_hours': _decimal(task.actual_hours),
+        'tags': task.tag_names,
+        'is_archived': task.is_archived,
+        'version': task.version,
+    }
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _decimal(value):
+    return str(value) if value is not None else None
+
+
+def serialize_comment(comment):
+    """Expects ``author`` to be selected."""
+    return {
+        'id': comment.pk,
+        'author': comment.author.name,
+        'content': comment.content,
+        'created_at': _isoformat(comment.created_at),
+        'updated_at': _isoformat(comment.updated_at),
+    }
+
+
+def serialize_attachment(attachment):
+    """Expects ``uploaded_by`` to be selected."""
+    return {
+        'id': attachment.pk,
+        'file_name': attachment.file_name,
+        'file_size': attachment.file_size,
+        'content_type': attachment.content_type,
+        'sha256': attachment.sha256,
+        'uploaded_by': attachment.uploaded_by.name,
+        'uploaded_at': _isoformat(attachment.uploaded_at),
+    }
@@ -0,0 +1,168 @@
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from . import events, lookups, saved_filters, search, stats
+from .models import Category, Member, Priority, SavedFilter, Status, Task
+
+# Sent by ``bulk.apply_action`` after each committed chunk, instead of the
+# per-object save/delete signals. ``before`` and ``after`` are lists of
+# ``bulk.TaskState`` in the same order; ``after`` is None for deletes.
+tasks_changed = Signal()
+
+
+def _stats_state(task):
+    # Read from __dict__ so deferred fields are not fetched just for this.
+    values = task.__dict__
+    if 'status_id' not in values or 'priority_id' not in values:
+        return None
+    return (values['status_id'], values['priority_id'])
+
+
+@receiver(post_init, sender=Task)
+def remember_task_state(sender, instance, **kwargs):
+    instance._stats_state = _stats_state(instance)
+    instance._loaded_tags = instance.__dict__.get('tags')
+
+
+@receiver(post_save, sender=Task)
+def update_stats_on_save(sender, instance, created, **kwargs):
+    new = (instance.status_id, instance.priority_id)
+    if created:
+        stats.record_change(None, new)
+    elif instance._stats_state is None:
+        stats.invalidate()
+    else:
+        stats.record_change(instance._stats_state, new)
+    instance._stats_state = new
+
+
+@receiver(post_save, sender=Task)
+def sync_task_tags(sender, instance, created, raw=False, **kwargs):
+    if raw or (not created and instance.tags == instance._loaded_tags):
+        return
+    instance.sync_tags()
+    instance._loaded_tags = instance.tags
+
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.publish('task.created' if created else 'task.updated', [instance])
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance, **kwargs):
+    events.publish('task.deleted', [instance])
+
+
+@receiver(post_delete, sender=Task)
+def update_stats_on_delete(sender, instance, **kwargs):
+    stats.record_change(instance._stats_state or (instance.status_id, instance.priority_id), None)
+
+
+@receiver(tasks_changed, sender=Task)
+def update_stats_on_bulk_change(sender, before, after, **kwargs):
+    stats.record_changes(
+        ((old.status_id, old.priority_id), (new.status_id, new.priority_id) if new else None)
+        for old, new in zip(before, after or [None] * len(before))
+    )
+
+
+@receiver(post_save, sender=Task)
+def update_saved_filters_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        task_id = instance.pk
+        transaction.on_commit(lambda: saved_filters.record_changes([task_id]))
+
+
+@receiver(post_delete, sender=Task)
+def update_saved_filters_on_delete(sender, instance, **kwargs):
+    task_id = instance.pk
+    transaction.on_commit(lambda: saved_filters.record_changes([task_id], deleted=True))
+
+
+@receiver(tasks_changed, sender=Task)
+def update_saved_filters_on_bulk_change(sender, before, after, **kwargs):
+    saved_filters.record_changes([state.id for state in before], deleted=after is None)
+
+
+@receiver(post_delete, sender=SavedFilter)
+def forget_saved_filter(sender, instance, **kwargs):
+    saved_filters.forget(instance)
+
+
+BULK_EVENTS = {
+    'delete': 'task.deleted',
+    'archive': 'task.archived',
+    'change_status': 'task.moved',
+    'change_priority': 'task.updated',
+}
+
+
+@receiver(tasks_changed, sender=Task)
+def publish_bulk_change(sender, action, before, after, **kwargs):
+    events.publish(BULK_EVENTS[action], [state._asdict() for state in after or before])
+
+
+@receiver(post_save, sender=Status)
+@receiver(post_delete, sender=Status)
+@receiver(post_save, sender=Priority)
+@receiver(post_delete, sender=Priority)
+def reset_stats(sender, **kwargs):
+    # Completion flags may have changed, and deleting a status or priority
+    # nulls the foreign key on its tasks without sending task signals.
+    stats.invalidate()
+
+
+@receiver(post_save, sender=Status)
+@receiver(post_delete, sender=Status)
+@receiver(post_save, sender=Priority)
+@receiver(post_delete, sender=Priority)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def reset_lookups(sender, **kwargs):
+    lookups.invalidate(sender)
+    # Again after commit, in case another process reloaded the old rows
+    # before this transaction became visible.
+    transaction.on_commit(lambda: lookups.invalidate(sender))
+
+
+@receiver(post_save, sender=Status)
+@receiver(post_delete, sender=Status)
+@receiver(post_save, sender=Priority)
+@receiver(post_delete, sender=Priority)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def reset_saved_filters(sender, **kwargs):
+    # Completion flags, member names and nulled foreign keys all change
+    # what a filter matches. Once committed, so no process recomputes a
+    # set from the old rows after this.
+    transaction.on_commit(saved_filters.invalidate)
+
+
+@receiver(pre_delete, sender=Member)
+def remember_commented_tasks(sender, instance, **kwargs):
+    # Deleting a member cascades to their comments without
+    # TaskComment.delete(), which keeps Task.comment_count.
+    instance._commented_task_ids = list(
+        instance.comments.order_by().values_list('task_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=Member)
+def recount_commented_tasks(sender, instance, **kwargs):
+    if instance._commented_task_ids:
+        Task.objects.filter(pk__in=instance._commented_task_ids).recount_comments()
+
+
+@receiver(post_migrate)
+def install_search_triggers(sender, using, **kwargs):
+    # Migrations that rebuild tasks_task on SQLite drop its triggers.
+    # A separate archive database never holds tasks_task.
+    if sender.name == 'tasks' and router.allow_migrate_model(using, Task):
+        search.ensure_index(using)
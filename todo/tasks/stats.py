@@ -0,0 +1,187 @@
+"""
+Cached task statistics.
+
+The counters shown on the board and the dashboard are kept in Django's cache
+and updated incrementally from the task write paths (see ``signals.py``; the
+bulk code paths in ``bulk.py`` report through the ``tasks_changed`` signal).
+The whole set is recomputed from the database when it is missing from the
+cache and at least every ``TASK_STATS_RECOMPUTE_INTERVAL`` seconds, which
+corrects any drift. The overdue count depends on the current time, so it is
+cached separately with a short TTL instead of being maintained incrementally.
+
+The counters are only shared between worker processes through a shared
+cache backend (``check --deploy`` warns otherwise). With a process-local
+cache each process only sees its own writes, so the default interval drops
+to a minute to bound how far processes disagree.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .checks import cache_is_process_local
+from .models import Priority, Status, Task
+
+RECOMPUTE_INTERVAL = getattr(
+    settings, 'TASK_STATS_RECOMPUTE_INTERVAL', 60 if cache_is_process_local() else 60 * 60,
+)
+OVERDUE_TTL = getattr(settings, 'TASK_STATS_OVERDUE_TTL', 60)
+
+STATE_KEY = 'task_stats:state'
+TOTAL_KEY = 'task_stats:total'
+COMPLETED_KEY = 'task_stats:completed'
+OVERDUE_KEY = 'task_stats:overdue'
+
+
+def _status_key(status_id):
+    return f'task_stats:status:{status_id}'
+
+
+def _priority_key(priority_id):
+    return f'task_stats:priority:{priority_id}'
+
+
+def recompute():
+    """Recount everything from the database and store it in the cache."""
+    status_totals = dict(
+        Task.objects.order_by().values_list('status').annotate(total=Count('pk'))
+    )
+    priority_totals = dict(
+        Task.objects.order_by().values_list('priority').annotate(total=Count('pk'))
+    )
+    statuses = dict(Status.objects.values_list('pk', 'is_completed'))
+    priority_ids = list(Priority.objects.values_list('pk', flat=True))
+
+    completed_ids = [pk for pk, is_completed in statuses.items() if is_completed]
+    values = {
+        TOTAL_KEY: sum(status_totals.values()),
+        COMPLETED_KEY: sum(status_totals.get(pk, 0) for pk in completed_ids),
+    }
+    for status_id in [None, *statuses]:
+        values[_status_key(status_id)] = status_totals.get(status_id, 0)
+    for priority_id in [None, *priority_ids]:
+        values[_priority_key(priority_id)] = priority_totals.get(priority_id, 0)
+
+    cache.set_many(values, timeout=None)
+    state = {
+        'statuses': list(statuses),
+        'priorities': priority_ids,
+        'completed': completed_ids,
+    }
+    cache.set(STATE_KEY, state, timeout=RECOMPUTE_INTERVAL)
+    return state
+
+
+def invalidate():
+    """Force a full recompute on the next read."""
+    cache.delete_many([STATE_KEY, OVERDUE_KEY])
+
+
+def get_stats():
+    """Return the board/dashboard counters.
+
+    ``status_counts`` and ``priority_counts`` map primary keys to the number
+    of tasks (archived included, like the totals).
+    """
+    state = cache.get(STATE_KEY) or recompute()
+    status_keys = {_status_key(pk): pk for pk in state['statuses']}
+    priority_keys = {_priority_key(pk): pk for pk in state['priorities']}
+    keys = [TOTAL_KEY, COMPLETED_KEY, *status_keys, *priority_keys]
+
+    values = cache.get_many(keys)
+    if len(values) != len(keys):
+        # A counter was evicted, so the increments applied to it are lost.
+        recompute()
+        values = cache.get_many(keys)
+
+    return {
+        'total_tasks': values.get(TOTAL_KEY, 0),
+        'completed_tasks': values.get(COMPLETED_KEY, 0),
+        'overdue_tasks': get_overdue_count(),
+        'status_counts': {pk: values.get(key, 0) for key, pk in status_keys.items()},
+        'priority_counts': {pk: values.get(key, 0) for key, pk in priority_keys.items()},
+    }
+
+
+def get_overdue_count():
+    return cache.get_or_set(OVERDUE_KEY, _count_overdue, timeout=OVERDUE_TTL)
+
+
+def _count_overdue():
+    return Task.objects.overdue().count()
+
+
+def record_change(old, new):
+    """Apply a single task write.
+
+    ``old`` and ``new`` are ``(status_id, priority_id)`` pairs, or ``None``
+    when the task was created or deleted respectively.
+    """
+    record_changes([(old, new)])
+
+
+def record_changes(changes):
+    """Apply many task writes given as ``(old, new)`` pairs, see ``record_change``."""
+    statuses = Counter()
+    priorities = Counter()
+    total = 0
+    for old, new in changes:
+        if old is not None:
+            statuses[old[0]] -= 1
+            priorities[old[1]] -= 1
+            total -= 1
+        if new is not None:
+            statuses[new[0]] += 1
+            priorities[new[1]] += 1
+            total += 1
+    apply_deltas(statuses=statuses, priorities=priorities, total=total)
+
+
+def record_status_move(queryset, status):
+    """Account for ``queryset.update(status=status)``; call before updating."""
+    moved = queryset.order_by().values_list('status').annotate(total=Count('pk'))
+    statuses = Counter()
+    for status_id, total in moved:
+        statuses[status_id] -= total
+        statuses[status.pk] += total
+    apply_deltas(statuses=statuses)
+
+
+def record_priority_move(queryset, priority):
+    """Account for ``queryset.update(priority=priority)``; call before updating."""
+    moved = queryset.order_by().values_list('priority').annotate(total=Count('pk'))
+    priorities = Counter()
+    for priority_id, total in moved:
+        priorities[priority_id] -= total
+        priorities[priority.pk] += total
+    apply_deltas(priorities=priorities)
+
+
+def apply_deltas(statuses=None, priorities=None, total=0):
+    """Add per-status/per-priority deltas to the cached counters."""
+    state = cache.get(STATE_KEY)
+    if state is None:
+        # Nothing cached yet; the next read recomputes from the database.
+        return
+
+    statuses = statuses or {}
+    priorities = priorities or {}
+    completed_ids = set(state['completed'])
+    deltas = Counter()
+    deltas[TOTAL_KEY] += total
+    for status_id, delta in statuses.items():
+        deltas[_status_key(status_id)] += delta
+        if status_id in completed_ids:
+            deltas[COMPLETED_KEY] += delta
+    for priority_id, delta in priorities.items():
+        deltas[_priority_key(priority_id)] += delta
+
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            invalidate()
+            return
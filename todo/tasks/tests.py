@@ -1,3 +1,1418 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, connections, transaction
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import archive, attachments, benchmarks, bulk, concurrency, events, facets, jobs, lookups, metrics, saved_filters, stats
+from .board import build_board
+from .checks import check_shared_cache
+from .database import ReadRouter, read_only
+from .filters import filter_tasks
+from .forms import TaskSearchForm
+from .middleware import QueryBudgetExceeded, QueryProfilerMiddleware
+from .moves import Move, MoveConflict, apply_moves
+from .routers import ArchiveRouter
+from .search import rank_ordering, search_tasks
+from .signals import tasks_changed
+from .transfer import TaskImporter, export_rows, read_rows, render_rows
+from .models import (
+    ArchivedTask, ArchivedTaskComment, Category, DailyTaskMetric, Job, Member, Priority, SavedFilter, Status,
+    Task, TaskAttachment, TaskComment, TaskTag,
+)
+
+# Templates that only touch the querysets a view hands over, for views whose
+# real templates are not part of this app.
+STUB_TEMPLATES = {
+    'dashboard.html': (
+        '{% for t in recent_tasks %}{{ t.name }}{% endfor %}'
+        '{% for t in upcoming_deadlines %}{{ t.name }}{% endfor %}'
+        '{% for s in status_counts %}{{ s.task_count }}{% endfor %}'
+    ),
+    'task_detail.html': '{{ task.name }}{% for c in comments %}{{ c.content }}{% endfor %}',
+}
+
+# Tables that grow with usage; a full scan of any of them fails the suite.
+LARGE_TABLES = ('tasks_task', 'tasks_tasktag')
+
+FULL_SCAN = re.compile(r'\bSCAN (%s)\b(?! USING)' % '|'.join(LARGE_TABLES))
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN every task query the hot views run and reject full table scans.
+
+    A ``SCAN ... USING [COVERING] INDEX`` is accepted: aggregates over all
+    tasks have to read an index end to end, but never the table itself.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', password='secret')
+        cls.todo = Status.objects.create(name='To Do', order=1)
+        cls.done = Status.objects.create(name='Done', order=2, is_completed=True)
+        cls.member = Member.objects.create(name='Ada')
+        cls.category = Category.objects.create(name='Ops')
+        cls.priority = Priority.objects.create(name='High', level=4)
+        now = timezone.now()
+        for i in range(20):
+            Task.objects.create(
+                name=f'Task {i}',
+                description='Rotate the deploy keys',
+                status=cls.done if i % 3 == 0 else cls.todo,
+                priority=cls.priority,
+                category=cls.category,
+                assigned_to=cls.member if i % 2 else None,
+                due_date=now + timedelta(days=i - 10),
+                tags='ops, security' if i % 2 else 'api',
+                is_archived=(i == 19),
+            )
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+        self.client.force_login(self.user)
+
+    def assertNoFullScans(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+
+        checked = 0
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(t in sql for t in LARGE_TABLES):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            self.assertIsNone(FULL_SCAN.search(plan), f'{sql}\n\n{plan}')
+            checked += 1
+        self.assertGreater(checked, 0)
+
+    def test_task_list(self):
+        self.assertNoFullScans(reverse('task_list'))
+
+    def test_task_list_filtered_by_status(self):
+        self.assertNoFullScans(reverse('task_list'), {'search_in': 'name', 'status': self.todo.pk})
+
+    def test_task_list_filtered_by_assignee(self):
+        self.assertNoFullScans(reverse('task_list'), {'search_in': 'name', 'assigned_to': self.member.pk})
+
+    def test_task_list_filtered_by_due_date(self):
+        today = timezone.now().date()
+        self.assertNoFullScans(reverse('task_list'), {
+            'search_in': 'name',
+            'due_date_from': today.isoformat(),
+            'due_date_to': (today + timedelta(days=5)).isoformat(),
+        })
+
+    def test_task_list_overdue(self):
+        self.assertNoFullScans(reverse('task_list'), {'search_in': 'name', 'show_overdue': 'on'})
+
+    def test_task_list_search(self):
+        self.assertNoFullScans(reverse('task_list'), {'search_in': 'all', 'search_query': 'deploy'})
+
+    def test_task_list_tag(self):
+        self.assertNoFullScans(reverse('task_list'), {'search_in': 'name', 'tag': 'sec', 'tag_match': 'prefix'})
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', STUB_TEMPLATES)]},
+    }])
+    def test_dashboard(self):
+        self.assertNoFullScans(reverse('dashboard'))
+
+    def test_partial_indexes_serve_hot_predicates(self):
+        def plan(queryset):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return '\n'.join(row[-1] for row in cursor.fetchall())
+
+        active = Task.objects.filter(is_archived=False)
+        self.assertIn('task_active_created_idx', plan(active.order_by('-created_at')[:20]))
+        self.assertIn('task_active_status_idx', plan(active.filter(status=self.todo).order_by('-created_at')[:20]))
+        self.assertIn('task_due_set_idx', plan(Task.objects.overdue().order_by().values('pk')))
+        today = timezone.now()
+        self.assertIn('task_completed_set_idx', plan(
+            Task.objects.filter(completed_at__range=(today - timedelta(days=1), today)).values('pk')
+        ))
+
+
+class BoardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.statuses = [Status.objects.create(name=name, order=i) for i, name in enumerate(['To Do', 'Doing', 'Done'])]
+        todo, doing, done = cls.statuses
+        for i in range(5):
+            Task.objects.create(name=f'Todo {i}', status=todo)
+        Task.objects.create(name='Doing 0', status=doing)
+
+    def test_two_queries_for_any_number_of_columns(self):
+        with self.assertNumQueries(2):  # tasks, per-status totals
+            columns = build_board(Task.objects.order_by('-created_at', '-id'), self.statuses, per_column_limit=3)
+        self.assertEqual([column.status for column in columns], self.statuses)
+        todo, doing, done = columns
+        self.assertEqual([task.name for task in todo.tasks], ['Todo 4', 'Todo 3', 'Todo 2'])
+        self.assertEqual((todo.count, todo.hidden_count), (5, 2))
+        self.assertEqual((len(doing.tasks), doing.count), (1, 1))
+        self.assertEqual((done.tasks, done.count), ([], 0))
+
+    def test_board_queries_do_not_grow_with_statuses(self):
+        self.client.force_login(User.objects.create_user('board'))
+
+        def board_queries():
+            cache.clear()
+            lookups.invalidate()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse('task_list')).status_code, 200)
+            return len(queries)
+
+        before = board_queries()
+        for name in ['Review', 'Blocked']:
+            Task.objects.create(name=name, status=Status.objects.create(name=name, order=10))
+        self.assertEqual(board_queries(), before)
+
+
+class StatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.todo = Status.objects.create(name='To Do', order=1)
+        cls.done = Status.objects.create(name='Done', order=2, is_completed=True)
+        cls.low = Priority.objects.create(name='Low', level=1)
+        cls.high = Priority.objects.create(name='High', level=4)
+        for i in range(4):
+            Task.objects.create(name=f'Task {i}', status=cls.todo, priority=cls.low)
+
+    def setUp(self):
+        cache.clear()
+        stats.get_stats()
+
+    def assertCountersMatchDatabase(self):
+        with self.assertNumQueries(0):
+            cached = stats.get_stats()
+        cache.clear()
+        self.assertEqual(cached, stats.get_stats())
+        return cached
+
+    def test_moves_are_applied_incrementally(self):
+        moved = Task.objects.filter(name__in=['Task 0', 'Task 1'])
+        stats.record_status_move(moved, self.done)
+        moved.update(status=self.done)
+        stats.record_priority_move(moved, self.high)
+        moved.update(priority=self.high)
+        counters = self.assertCountersMatchDatabase()
+        self.assertEqual(counters['completed_tasks'], 2)
+        self.assertEqual(counters['status_counts'], {self.todo.pk: 2, self.done.pk: 2})
+        self.assertEqual(counters['priority_counts'], {self.low.pk: 2, self.high.pk: 2})
+
+    def test_saves_and_deletes_are_applied_incrementally(self):
+        task = Task.objects.get(name='Task 0')
+        task.status = self.done
+        task.save()
+        Task.objects.create(name='New', status=self.todo, priority=self.high)
+        Task.objects.get(name='Task 1').delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.apply_action([Task.objects.get(name='Task 2').pk], 'change_priority', priority=self.high)
+        counters = self.assertCountersMatchDatabase()
+        self.assertEqual((counters['total_tasks'], counters['completed_tasks']), (4, 1))
+
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['tasks.W001'])
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = Member.objects.create(name='Deploy Ada')
+        cls.in_name = Task.objects.create(name='Deploy the API', description='Roll out')
+        cls.in_description = Task.objects.create(name='Release', description='Deploy after review')
+        cls.by_assignee = Task.objects.create(name='Review', assigned_to=cls.ada)
+        Task.objects.create(name='Unrelated', description='Nothing here')
+
+    def search(self, query):
+        queryset = search_tasks(Task.objects.all(), query, 'all')
+        return queryset.order_by(*rank_ordering(queryset))
+
+    def test_ranks_matches_in_one_query(self):
+        with self.assertNumQueries(1):
+            tasks = list(self.search('deploy'))
+        # Name hits weigh most; assignee-only matches rank last.
+        self.assertEqual(tasks, [self.in_name, self.in_description, self.by_assignee])
+        self.assertGreater(tasks[0].search_rank, tasks[1].search_rank)
+        self.assertEqual(tasks[2].search_rank, 0)
+
+    def explain(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def test_match_is_not_run_per_row(self):
+        todo = Status.objects.create(name='To Do')
+        Task.objects.update(status=todo)
+        with CaptureQueriesContext(connection) as queries:
+            build_board(self.search('deploy'), [todo], per_column_limit=2)
+        # The capped board orders its window by the rank too.
+        board_sql = next(query['sql'] for query in queries.captured_queries if 'ROW_NUMBER' in query['sql'])
+
+        for plan in (self.explain(*self.search('deploy').query.sql_with_params()), self.explain(board_sql)):
+            # A MATCH constrained by rowid ("=M") would be a lookup per candidate
+            # row, and a co-routine is re-run each time the correlated rank reads it.
+            self.assertNotIn(':=M', plan)
+            self.assertNotIn('CO-ROUTINE ranked', plan)
+            self.assertIn('MATERIALIZE ranked', plan)
+
+
+class TagTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.api = Task.objects.create(name='Gateway', tags='API, Backend')
+        cls.rapid = Task.objects.create(name='Prototype', tags='rapid')
+
+    def search(self, tag, match='exact'):
+        return set(filter_tasks({'search_in': 'name', 'tag': tag, 'tag_match': match}, Task.objects.all()))
+
+    def test_saving_syncs_tag_rows(self):
+        self.assertEqual(sorted(self.api.tag_set.values_list('name', flat=True)), ['api', 'backend'])
+        self.api.tags = 'backend, ops'
+        self.api.save()
+        self.assertEqual(sorted(self.api.tag_set.values_list('name', flat=True)), ['backend', 'ops'])
+
+    def test_exact_and_prefix_match(self):
+        # Whole tag names, not substrings of the tags string.
+        self.assertEqual(self.search('api'), {self.api})
+        self.assertEqual(self.search('ra', 'prefix'), {self.rapid})
+        self.assertEqual(self.search('API'), {self.api})
+
+    def test_tag_names_are_prefetched(self):
+        with self.assertNumQueries(2):
+            tasks = list(Task.objects.prefetch_related('tag_set').order_by('pk'))
+            self.assertEqual([task.tag_names for task in tasks], [['api', 'backend'], ['rapid']])
+
+
+class TaskListApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('api', password='secret')
+        cls.todo = Status.objects.create(name='To Do', order=1)
+        cls.done = Status.objects.create(name='Done', order=2, is_completed=True)
+        cls.tasks = [
+            Task.objects.create(name=f'Task {i}', status=cls.done if i == 4 else cls.todo)
+            for i in range(5)
+        ]
+        # Equal timestamps, so pages depend on the id tie-breaker.
+        Task.objects.update(created_at=timezone.now())
+
+    def setUp(self):
+        lookups.invalidate()
+        self.client.force_login(self.user)
+
+    def test_filters_apply_without_search_in(self):
+        response = self.client.get(reverse('task_list_api'), {'status': self.done.pk})
+        self.assertEqual([task['id'] for task in response.json()['results']], [self.tasks[4].pk])
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.get(reverse('task_list_api'), {'status': 999})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json()['errors'])
+
+    def test_cursor_pages_cover_every_task_once(self):
+        url = reverse('task_list_api')
+        seen, cursor, pages = [], None, []
+        while True:
+            data = self.client.get(url, {'page_size': 2, 'count': 'exact', **({'cursor': cursor} if cursor else {})}).json()
+            self.assertEqual(data['count'], 5)
+            pages.append(data)
+            seen += [task['id'] for task in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, sorted((task.pk for task in self.tasks), reverse=True))
+        self.assertEqual(len(pages), 3)
+
+        back = self.client.get(url, {'page_size': 2, 'cursor': pages[2]['previous_cursor']}).json()
+        self.assertEqual(back['results'], pages[1]['results'])
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 400)
+
+    def test_export_applies_filters(self):
+        response = self.client.get(reverse('export_tasks'), {'format': 'jsonl', 'status': self.done.pk})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Task 4'])
+        self.assertEqual(self.client.get(reverse('export_tasks'), {'status': 999}).status_code, 400)
+
+
+class MoveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('mover', password='secret')
+        cls.todo = Status.objects.create(name='To Do', order=1)
+        cls.done = Status.objects.create(name='Done', order=2, is_completed=True)
+        cls.first = Task.objects.create(name='First', status=cls.todo)
+        cls.second = Task.objects.create(name='Second', status=cls.todo)
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), json.dumps(data), content_type='application/json')
+
+    def test_stale_versions_are_rejected(self):
+        version = self.first.version
+        results, conflicts = apply_moves([
+            Move(self.first.pk, self.done.pk, version),
+            Move(self.second.pk, self.done.pk, self.second.version - 1),
+        ])
+        self.assertEqual([(r.task_id, r.version) for r in results], [(self.first.pk, version + 1)])
+        self.assertEqual(conflicts, [MoveConflict(self.second.pk, 'Task was changed by someone else', self.second.version)])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, self.done)
+        self.assertIsNotNone(self.first.completed_at)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.status, self.todo)
+
+    def test_moves_send_tasks_changed(self):
+        received = []
+
+        def receiver(**kwargs):
+            received.append((kwargs['action'], kwargs['before'], kwargs['after']))
+
+        tasks_changed.connect(receiver, sender=Task)
+        self.addCleanup(tasks_changed.disconnect, receiver, sender=Task)
+        with self.captureOnCommitCallbacks(execute=True):
+            results, _ = apply_moves([Move(self.first.pk, self.done.pk), Move(self.second.pk, self.todo.pk)])
+        [(action, before, after)] = received
+        self.assertEqual(action, 'change_status')
+        self.assertEqual([(state.id, state.status_id) for state in before], [(self.first.pk, self.todo.pk)])
+        self.assertEqual([(state.id, state.status_id) for state in after], [(self.first.pk, self.done.pk)])
+
+        # The move to the current column is reported but writes nothing.
+        self.assertEqual({r.task_id: r.version for r in results}[self.second.pk], self.second.version)
+        second = Task.objects.get(pk=self.second.pk)
+        self.assertEqual((second.version, second.updated_at), (self.second.version, self.second.updated_at))
+
+    def test_update_task_status(self):
+        data = {'task_id': self.first.pk, 'status_id': self.done.pk, 'version': self.first.version - 1}
+        response = self.post('update_task_status', data)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['version'], self.first.version)
+
+        response = self.post('update_task_status', {**data, 'status_id': 999})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.post('update_task_status', {**data, 'version': self.first.version})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], self.first.version + 1)
+
+    def test_move_tasks_batch(self):
+        self.client.force_login(self.user)
+        moves = [
+            {'task_id': self.first.pk, 'status_id': self.done.pk, 'version': self.first.version},
+            {'task_id': self.second.pk, 'status_id': self.done.pk, 'version': 0},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post('move_tasks', {'moves': moves})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([move['task_id'] for move in response.json()['moved']], [self.first.pk])
+        self.assertEqual([conflict['task_id'] for conflict in response.json()['conflicts']], [self.second.pk])
+
+        # An unknown status makes the whole request invalid; nothing moves.
+        moves = [{'task_id': self.second.pk, 'status_id': self.done.pk}, {'task_id': self.first.pk, 'status_id': 999}]
+        self.assertEqual(self.post('move_tasks', {'moves': moves}).status_code, 400)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.status, self.todo)
+        self.assertEqual(self.post('move_tasks', {'moves': [{'task_id': 'x'}]}).status_code, 400)
+
+
+class TransferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        status = Status.objects.create(name='To Do')
+        cls.high = Priority.objects.create(name='High', level=4)
+        Task.objects.create(
+            name='Rotate keys', description='Quarterly, "all" hosts', status=status, priority=cls.high,
+            category=Category.objects.create(name='Ops'), assigned_to=Member.objects.create(name='Ada'),
+            due_date=timezone.now() + timedelta(days=3), estimated_hours='1.50', tags='ops, security',
+        )
+
+    def round_trip(self, format):
+        lines = list(render_rows(export_rows(Task.objects.all()), format))
+        exported = list(export_rows(Task.objects.all()))
+        Task.objects.all().delete()
+        importer = TaskImporter()
+        importer.run(read_rows(''.join(lines).splitlines(keepends=True), format))
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(list(export_rows(Task.objects.all())), exported)
+
+    def test_csv_round_trip(self):
+        self.round_trip('csv')
+
+    def test_jsonl_round_trip(self):
+        self.round_trip('jsonl')
+        self.assertEqual(Task.objects.get().tag_names, ['ops', 'security'])
+
+    def test_bad_rows_are_skipped(self):
+        lines = [
+            '{"name": "Good"}\n',
+            '{"name": "Broken"\n',
+            '["not", "an", "object"]\n',
+            json.dumps({'name': 'x' * 201}) + '\n',
+            json.dumps({'name': 'Long category', 'category': 'c' * 101}) + '\n',
+            json.dumps({'name': 'Unknown priority', 'priority': 'Urgent'}) + '\n',
+            json.dumps({'name': 'Bad date', 'due_date': 'soon'}) + '\n',
+            json.dumps({'name': 'Too many hours', 'estimated_hours': '1234.5'}) + '\n',
+            json.dumps({'name': 'Too precise', 'actual_hours': '1.125'}) + '\n',
+            json.dumps({'name': 'Not a number', 'estimated_hours': 'lots'}) + '\n',
+            '{"name": "Also good", "priority": "High", "estimated_hours": "999.99"}\n',
+        ]
+        importer = TaskImporter()
+        self.assertEqual(importer.run(read_rows(lines, 'jsonl')), 2)
+        self.assertEqual([number for number, error in importer.errors], [2, 3, 4, 5, 6, 7, 8, 9, 10])
+        self.assertIn('estimated_hours', importer.errors[6][1])
+        self.assertTrue(Task.objects.filter(name='Also good', priority=self.high).exists())
+        self.assertFalse(Category.objects.filter(name__startswith='ccc').exists())
+
+
+class QueryProfilerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('profiler', password='secret')
+        status = Status.objects.create(name='To Do')
+        for i in range(5):
+            Task.objects.create(name=f'Task {i}', status=status)
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+
+    @override_settings(QUERY_PROFILER={'ENABLED': True})
+    def test_server_timing_header_for_staff_only(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('task_list'))
+        self.assertNotIn('Server-Timing', response)
+
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get(reverse('task_list'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+')
+        # The read_only board renders after the middleware starts timing it.
+        self.assertGreater(response.wsgi_request.query_profile.template_time, 0)
+
+    def test_disabled_outside_debug_by_default(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('task_list'))
+        self.assertFalse(hasattr(response.wsgi_request, 'query_profile'))
+
+    @override_settings(QUERY_PROFILER={'ENABLED': True, 'MAX_REPEATS': 3, 'RAISE': True})
+    def test_n_plus_one_raises(self):
+        def view(request):
+            names = [task.status.name for task in Task.objects.all()]
+            return HttpResponse(', '.join(names))
+
+        middleware = QueryProfilerMiddleware(view)
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'tasks_status'):
+            middleware(RequestFactory().get('/'))
+
+    @override_settings(QUERY_PROFILER={'ENABLED': True, 'MAX_QUERIES': 25, 'MAX_REPEATS': 3, 'RAISE': True})
+    def test_task_list_within_budget(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('task_list'))
+
+
+class QueryProfilerThreadTests(SimpleTestCase):
+    databases = {'default', 'replica'}
+
+    @override_settings(QUERY_PROFILER={'ENABLED': True})
+    def test_counts_queries_on_worker_threads_and_every_alias(self):
+        def query(alias):
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                connections.close_all()
+
+        async def view(request):
+            await sync_to_async(query, thread_sensitive=False)('default')
+            await sync_to_async(query, thread_sensitive=False)('replica')
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        async_to_sync(QueryProfilerMiddleware(view))(request)
+        self.assertEqual(request.query_profile.query_count, 2)
+
+
+class LookupCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lookups', password='secret')
+        cls.todo = Status.objects.create(name='To Do', order=1)
+        Priority.objects.create(name='High', level=4)
+        Category.objects.create(name='Ops')
+        Member.objects.create(name='Ada')
+        Task.objects.create(name='Task', status=cls.todo)
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+
+    def test_task_list_reads_reference_tables_from_cache(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('task_list'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('task_list'))
+        self.assertContains(response, 'Ada')
+        tables = ('tasks_status', 'tasks_priority', 'tasks_category', 'tasks_member')
+        for query in queries.captured_queries:
+            self.assertNotRegex(query['sql'], r'FROM "(%s)"' % '|'.join(tables))
+
+    def test_write_invalidates(self):
+        form = TaskSearchForm({'search_in': 'name', 'status': self.todo.pk})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['status'], self.todo)
+
+        done = Status.objects.create(name='Done', order=2)
+        self.assertIn('Done', str(TaskSearchForm()['status']))
+        self.assertTrue(TaskSearchForm({'search_in': 'name', 'status': done.pk}).is_valid())
+
+        Status.objects.get(pk=self.todo.pk).delete()
+        form = TaskSearchForm({'search_in': 'name', 'status': self.todo.pk})
+        self.assertFalse(form.is_valid())
+        self.assertIn('status', form.errors)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_cache_that_stores_nothing(self):
+        lookups.invalidate()
+        before = lookups.version()
+        self.assertEqual(lookups.version(), before)
+        Status.objects.create(name='Done', order=2)
+        self.assertNotEqual(lookups.version(), before)
+
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('task_list')), 'Ada')
+
+
+class CardCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cards', password='secret')
+        status = Status.objects.create(name='To Do')
+        cls.low = Priority.objects.create(name='Low', level=1)
+        cls.high = Priority.objects.create(name='Urgent', level=5)
+        cls.task = Task.objects.create(name='Card', status=status, priority=cls.low)
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+        self.client.force_login(self.user)
+
+    def card(self):
+        response = self.client.get(reverse('task_list'))
+        html = response.content.decode()
+        start = html.index(f'data-task-id="{self.task.pk}"')
+        return html[start:html.index('task-footer', start)]
+
+    def test_bulk_update_refreshes_card(self):
+        self.assertIn('Low', self.card())
+        self.client.post(reverse('bulk_actions'), {
+            'action': 'change_priority', 'task_ids': [self.task.pk], 'priority_id': self.high.pk,
+        })
+        self.assertIn('Urgent', self.card())
+
+    def test_save_and_lookup_changes_refresh_card(self):
+        self.card()
+        self.task.name = 'Renamed card'
+        self.task.save()
+        self.assertIn('Renamed card', self.card())
+
+        self.low.color = '#123456'
+        self.low.save()
+        self.assertIn('#123456', self.card())
+
+
+class TaskEventTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('events', password='secret')
+        cls.todo = Status.objects.create(name='To Do')
+        cls.done = Status.objects.create(name='Done', is_completed=True)
+        cls.task = Task.objects.create(name='Task', status=cls.todo)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def receive(self, action):
+        """Run ``action`` and return the events it published."""
+        backend = events.get_backend()
+
+        def run_and_commit():
+            with self.captureOnCommitCallbacks(execute=True):
+                action()
+
+        async def listen():
+            subscription = backend.subscribe()
+            try:
+                await sync_to_async(run_and_commit)()
+                received = []
+                while not subscription.queue.empty() or not received:
+                    received.append(await asyncio.wait_for(subscription.get(), 1))
+                return received
+            finally:
+                backend.unsubscribe(subscription)
+
+        return async_to_sync(listen)()
+
+    def test_bulk_status_change_publishes_move(self):
+        received = self.receive(lambda: self.client.post(reverse('bulk_actions'), {
+            'action': 'change_status', 'task_ids': [self.task.pk], 'status_id': self.done.pk,
+        }))
+        self.task.refresh_from_db()
+        self.assertEqual(received, [{'event': 'task.moved', 'tasks': [
+            {'id': self.task.pk, 'status_id': self.done.pk, 'version': self.task.version},
+        ]}])
+
+    def test_save_publishes_update(self):
+        def rename():
+            self.task.name = 'Renamed'
+            self.task.save()
+
+        received = self.receive(rename)
+        self.assertEqual([event['event'] for event in received], ['task.updated'])
+
+    def test_stream_format(self):
+        async def first_event():
+            subscription = events.get_backend().subscribe()
+            events.get_backend().publish({'event': 'task.deleted', 'tasks': []})
+            chunks = events.stream(subscription)
+            try:
+                return [await chunks.__anext__(), await chunks.__anext__()]
+            finally:
+                events.get_backend().unsubscribe(subscription)
+
+        self.assertEqual(async_to_sync(first_event)(), [
+            'retry: 3000\n\n', 'data: {"event": "task.deleted", "tasks": []}\n\n',
+        ])
+
+    def test_no_stream_under_wsgi(self):
+        # A stream would hold the WSGI worker for as long as the board is open.
+        self.assertEqual(self.client.get(reverse('task_events')).status_code, 204)
+        self.assertNotContains(self.client.get(reverse('task_list')), 'EventSource')
+
+    async def test_board_subscribes_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('task_list'))
+        self.assertContains(response, 'new EventSource')
+
+
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('metrics', password='secret')
+        cls.todo = Status.objects.create(name='To Do')
+        cls.done = Status.objects.create(name='Done', is_completed=True)
+        cls.member = Member.objects.create(name='Ada')
+        now = timezone.now()
+        for i in range(3):
+            Task.objects.create(name=f'Open {i}', status=cls.todo, assigned_to=cls.member,
+                                due_date=now - timedelta(days=1) if i else None)
+        Task.objects.create(name='Done', status=cls.done, completed_at=now)
+        cls.today = timezone.localdate()
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+
+    def test_rollup(self):
+        metrics.rollup(self.today - timedelta(days=7))
+        total = DailyTaskMetric.objects.get(dimension='total', date=self.today)
+        self.assertEqual((total.created, total.completed, total.open, total.overdue), (4, 1, 3, 2))
+        member = DailyTaskMetric.objects.get(dimension='member', key=self.member.pk, date=self.today)
+        self.assertEqual((member.created, member.completed, member.open), (3, 0, 3))
+
+        # Re-running replaces the counts instead of adding to them.
+        Task.objects.filter(name='Open 0').delete()
+        metrics.rollup(self.today)
+        total.refresh_from_db()
+        self.assertEqual((total.created, total.open), (3, 2))
+
+    def test_api_reads_rollups(self):
+        metrics.rollup(self.today)
+        lookups.get_all(Status)
+        self.client.force_login(self.user)
+        with self.assertNumQueries(3):  # session, user, rollups
+            response = self.client.get(reverse('metrics_api'), {
+                'metric': 'created', 'dimension': 'status',
+                'start': (self.today - timedelta(days=1)).isoformat(),
+            })
+        series = {s['label']: s['points'] for s in response.json()['series']}
+        yesterday = (self.today - timedelta(days=1)).isoformat()
+        self.assertEqual(series, {
+            'To Do': [[yesterday, 0], [self.today.isoformat(), 3]],
+            'Done': [[yesterday, 0], [self.today.isoformat(), 1]],
+        })
+        self.assertEqual(self.client.get(reverse('metrics_api'), {'metric': 'bogus'}).status_code, 400)
+
+
+class JobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('jobs', password='secret')
+        status = Status.objects.create(name='To Do')
+        cls.tasks = [Task.objects.create(name=f'Task {i}', status=status) for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    @mock.patch('tasks.views.INLINE_LIMIT', 1)
+    @mock.patch('tasks.bulk.CHUNK_SIZE', 2)
+    def test_large_bulk_action_runs_as_job(self):
+        self.client.post(reverse('bulk_actions'), {
+            'action': 'archive', 'task_ids': [task.pk for task in self.tasks],
+        })
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertFalse(Task.objects.filter(is_archived=True).exists())
+
+        self.assertEqual(jobs.run_next('test').status, Job.DONE)
+        self.assertEqual(Task.objects.filter(is_archived=True).count(), 3)
+        self.assertEqual(jobs.run_next('test'), None)
+
+        data = self.client.get(reverse('job_status', args=[job.pk])).json()
+        self.assertEqual((data['status'], data['processed'], data['progress']), ('done', 3, 1.0))
+        self.assertEqual(data['result'], {'changed': 3})
+
+    def test_failed_job(self):
+        job = jobs.enqueue('export', {'format': 'xml'}, user=self.user)
+        with self.assertLogs('tasks.jobs', 'ERROR'):
+            jobs.run_next('test')
+        data = self.client.get(reverse('job_status', args=[job.pk])).json()
+        self.assertEqual(data['status'], 'failed')
+        self.assertIn("Unknown format 'xml'", data['error'])
+
+    def test_requeued_job_loses_its_lease(self):
+        job = jobs.enqueue('bulk_action', {'action': 'archive', 'task_ids': [task.pk for task in self.tasks]})
+        slow = jobs.claim('slow')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        fast = jobs.claim('fast')
+        self.assertEqual(fast.pk, job.pk)
+        self.assertNotEqual(fast.lease, slow.lease)
+
+        # The slow worker stops at its next heartbeat.
+        with self.assertLogs('tasks.jobs', 'WARNING'):
+            jobs.run(slow)
+        self.assertFalse(Task.objects.filter(is_archived=True).exists())
+        self.assertEqual(jobs.run(fast).status, Job.DONE)
+
+        # Nor can it record a result over the new run's.
+        with mock.patch.dict(jobs.HANDLERS, {'bulk_action': lambda job: {'changed': 0}}):
+            with self.assertLogs('tasks.jobs', 'WARNING'):
+                jobs.run(slow)
+        job.refresh_from_db()
+        self.assertEqual((job.worker, job.result), ('fast', {'changed': 3}))
+
+    def test_sweep_removes_expired_exports(self):
+        export_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(mock.patch('tasks.jobs.EXPORT_DIR', export_dir))
+        job = jobs.enqueue('export', {'format': 'csv'}, user=self.user)
+        jobs.run_next('test')
+        url = reverse('job_download', args=[job.pk])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        jobs.enqueue('sweep_attachments', {})
+        self.assertEqual(jobs.run_next('test').result['exports_removed'], 0)
+        written = time.time() - jobs.EXPORT_TTL - 1
+        os.utime(export_dir / Job.objects.get(pk=job.pk).result['file'], (written, written))
+        jobs.enqueue('sweep_attachments', {})
+        self.assertEqual(jobs.run_next('test').result['exports_removed'], 1)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class BulkEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.todo = Status.objects.create(name='To Do')
+        cls.done = Status.objects.create(name='Done', is_completed=True)
+        member = Member.objects.create(name='Ada')
+        cls.tasks = [Task.objects.create(name=f'Task {i}', status=cls.todo, tags='ops') for i in range(5)]
+        for task in cls.tasks:
+            TaskComment.objects.create(task=task, author=member, content='Looks good')
+
+    def setUp(self):
+        cache.clear()
+        stats.get_stats()
+
+    def assertStatsConsistent(self):
+        cached = stats.get_stats()
+        stats.recompute()
+        self.assertEqual(cached, stats.get_stats())
+
+    @mock.patch('tasks.bulk.CHUNK_SIZE', 2)
+    def test_change_status_into_completed(self):
+        ids = [task.pk for task in self.tasks]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            changed = bulk.apply_action(ids, 'change_status', status=self.done)
+        self.assertEqual(changed, 5)
+        self.assertEqual(len(callbacks), 3 + 3)  # change signal and live event per chunk
+        self.assertFalse(Task.objects.filter(completed_at__isnull=True).exists())
+        self.assertFalse(Task.objects.filter(version=1).exists())
+        self.assertStatsConsistent()
+
+    def test_delete_cascades_without_loading_tasks(self):
+        ids = [task.pk for task in self.tasks[:3]]
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(bulk.apply_action(ids, 'delete'), 3)
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertEqual(TaskComment.objects.count(), 2)
+        self.assertEqual(TaskTag.objects.count(), 2)
+        # One state read plus one DELETE per table, however many tasks.
+        statements = [q['sql'] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(statements), 5, statements)
+        self.assertStatsConsistent()
+
+
+class ArchiveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('archive', password='secret')
+        cls.todo = Status.objects.create(name='To Do')
+        cls.done = Status.objects.create(name='Done', is_completed=True)
+        cls.member = Member.objects.create(name='Ada')
+        cls.old = Task.objects.create(name='Old release', status=cls.done, tags='release, ops')
+        Task.objects.filter(pk=cls.old.pk).update(completed_at=timezone.now() - timedelta(days=400))
+        cls.shelved = Task.objects.create(name='Shelved idea', status=cls.todo, is_archived=True)
+        TaskComment.objects.create(task=cls.shelved, author=cls.member, content='Maybe later')
+        cls.current = Task.objects.create(name='Current work', status=cls.todo)
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+        stats.get_stats()
+        self.client.force_login(self.user)
+
+    def test_moves_tasks_to_cold_tables(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive.archive_tasks(batch_size=1), 2)
+        self.assertEqual(list(Task.objects.values_list('pk', flat=True)), [self.current.pk])
+        self.assertEqual(ArchivedTask.objects.count(), 2)
+        self.assertEqual(ArchivedTaskComment.objects.get().task_id, self.shelved.pk)
+        self.assertFalse(TaskComment.objects.exists())
+
+        cached = stats.get_stats()
+        stats.recompute()
+        self.assertEqual(cached, stats.get_stats())
+        self.assertEqual(archive.archive_tasks(), 0)
+
+    @override_settings(TASK_ARCHIVE_DATABASE='archive')
+    def test_router_keeps_unhinted_migrations_off_the_archive(self):
+        router = ArchiveRouter()
+        # RunPython/RunSQL operations without hints, like the search triggers.
+        self.assertIs(router.allow_migrate('archive', 'tasks'), False)
+        self.assertIs(router.allow_migrate('default', 'tasks'), True)
+        self.assertIs(router.allow_migrate('archive', 'tasks', 'archivedtask'), True)
+        self.assertIs(router.allow_migrate('default', 'tasks', 'archivedtask'), False)
+
+    def test_failed_cold_commit_keeps_hot_rows(self):
+        atomic = transaction.atomic
+
+        @contextmanager
+        def cold_commit_fails(using=None):
+            if using != 'cold':
+                with atomic(using=using):
+                    yield
+                return
+            yield
+            raise DatabaseError('commit failed')
+
+        # Pretend the cold tables are in another database whose commit fails.
+        router = mock.Mock()
+        router.db_for_write.side_effect = lambda model: 'cold' if model is ArchivedTask else 'default'
+        with mock.patch.object(archive, 'router', router), \
+                mock.patch.object(archive, 'transaction', mock.Mock(atomic=cold_commit_fails)):
+            with self.assertRaises(DatabaseError):
+                archive.archive_tasks()
+        self.assertEqual(Task.objects.count(), 3)
+        self.assertTrue(TaskComment.objects.exists())
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', STUB_TEMPLATES)]},
+    }])
+    def test_detail_falls_back_to_archive(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            archive.archive_tasks()
+        response = self.client.get(reverse('task_detail', args=[self.shelved.pk]))
+        self.assertContains(response, 'Shelved idea')
+        self.assertContains(response, 'Maybe later')
+        self.assertEqual(self.client.get(reverse('task_detail', args=[0])).status_code, 404)
+
+    def test_search_includes_archive_on_request(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            archive.archive_tasks()
+        params = {'search_in': 'all', 'search_query': 'release', 'show_archived': 'on'}
+        response = self.client.get(reverse('task_list'), params)
+        self.assertEqual([task.pk for task in response.context['archived_tasks']], [self.old.pk])
+        self.assertEqual(response.context['archived_tasks'][0].tag_names, ['release', 'ops'])
+
+        del params['show_archived']
+        response = self.client.get(reverse('task_list'), params)
+        self.assertEqual(response.context['archived_tasks'], [])
+
+
+class DueDateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('due', password='secret')
+        todo = Status.objects.create(name='To Do')
+        done = Status.objects.create(name='Done', is_completed=True)
+        now = timezone.now()
+        cls.late = Task.objects.create(name='Late', status=todo, due_date=now - timedelta(days=2, hours=1))
+        cls.soon = Task.objects.create(name='Soon', status=todo, due_date=now + timedelta(days=3, hours=1))
+        cls.finished = Task.objects.create(name='Finished', status=done, due_date=now - timedelta(days=5))
+        cls.open_ended = Task.objects.create(name='Open ended', status=todo)
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+
+    def test_annotations_match_properties(self):
+        now = timezone.now()
+        for task in Task.objects.with_due_dates(now):
+            plain = Task.objects.select_related('status').get(pk=task.pk)
+            self.assertEqual((task.is_overdue, task.days_until_due), (plain.is_overdue, plain.days_until_due))
+        late = Task.objects.with_due_dates(now).get(pk=self.late.pk)
+        self.assertEqual((late.days_until_due, late.days_until_due_abs), (-3, 3))
+
+    def test_filter_and_order(self):
+        tasks = Task.objects.with_due_dates()
+        self.assertEqual(list(tasks.filter(is_overdue=True)), [self.late])
+        self.assertEqual(
+            list(tasks.filter(days_until_due__isnull=False).order_by('days_until_due').values_list('name', flat=True)),
+            ['Finished', 'Late', 'Soon'],
+        )
+        self.assertEqual(stats.get_stats()['overdue_tasks'], 1)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('task_list'), {'search_in': 'all', 'show_overdue': 'on'})
+        self.assertEqual(list(response.context['tasks']), [self.late])
+
+
+class TaskActivityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('activity', password='secret')
+        cls.task = Task.objects.create(name='Incident')
+        cls.members = [Member.objects.create(name=f'Responder {i}') for i in range(3)]
+        TaskComment.objects.bulk_create([
+            TaskComment(task=cls.task, author=cls.members[i % 3], content=f'Update {i}') for i in range(45)
+        ])
+        Task.objects.filter(pk=cls.task.pk).recount_comments()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_comment_count_maintained(self):
+        stale = Task.objects.get(pk=self.task.pk)
+        self.assertEqual(stale.comment_count, 45)
+        comment = TaskComment.objects.create(task=self.task, author=self.members[0], content='Resolved')
+        stale.name = 'Incident (resolved)'
+        stale.save()
+        self.assertEqual(Task.objects.get(pk=self.task.pk).comment_count, 46)
+        comment.delete()
+        self.assertEqual(Task.objects.get(pk=self.task.pk).comment_count, 45)
+
+    def test_deleting_an_author_recounts(self):
+        self.members[0].delete()
+        self.assertEqual(Task.objects.get(pk=self.task.pk).comment_count, 30)
+
+    def test_save_of_loaded_task_only_updates(self):
+        task = Task.objects.get(pk=self.task.pk)
+        Task.objects.filter(pk=task.pk).delete()
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            task.save()
+        task.save(force_insert=True)
+        self.assertTrue(Task.objects.filter(pk=task.pk).exists())
+
+    def test_load_more_pages(self):
+        url = reverse('task_comments', args=[self.task.pk])
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(4):  # session, user, task, page with authors
+                data = self.client.get(url, {'cursor': cursor} if cursor else {}).json()
+            seen += [comment['content'] for comment in data['results']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'Update {i}' for i in reversed(range(45))])
+        self.assertEqual(self.client.get(url, {'cursor': 'bogus'}).status_code, 400)
+
+
+class ReadRouterTests(SimpleTestCase):
+
+    def test_read_only_views_read_from_replica(self):
+        router = ReadRouter()
+        seen = []
+
+        @read_only
+        def view(request):
+            seen.append((router.db_for_read(Task), router.db_for_write(Task)))
+            return HttpResponse()
+
+        view(RequestFactory().get('/'))
+        self.assertEqual(seen, [('replica', 'default')])
+        self.assertIsNone(router.db_for_read(Task))
+
+        with override_settings(TASK_READ_DATABASE=None):
+            view(RequestFactory().get('/'))
+        self.assertEqual(seen[-1], (None, None))
+
+    def test_template_responses_render_on_replica(self):
+        router = ReadRouter()
+        seen = []
+
+        @read_only
+        def view(request):
+            response = TemplateResponse(request, engines['django'].from_string('{{ x }}'))
+            response.add_post_render_callback(lambda r: seen.append(router.db_for_read(Task)))
+            return response
+
+        response = view(RequestFactory().get('/'))
+        # Rendering is left to the handler, after template response middleware.
+        self.assertFalse(response.is_rendered)
+        response.render()
+        self.assertEqual(seen, ['replica'])
+
+
+class ConcurrencyTests(TransactionTestCase):
+    # Outside TestCase's transaction, so the worker threads are used.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+        self.user = User.objects.create_user('concurrent', password='secret')
+        status = Status.objects.create(name='To Do')
+        for i in range(3):
+            Task.objects.create(name=f'Task {i}', status=status)
+
+    def test_workers_keep_their_connections(self):
+        def count():
+            total = Task.objects.count()
+            return threading.current_thread(), id(connection.connection), total
+
+        results = []
+        for _ in range(5):
+            results += concurrency.run_concurrently(*[count] * 4)
+        self.assertEqual({total for *_, total in results}, {3})
+        threads = {thread for thread, *_ in results}
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertLessEqual(len(threads), concurrency.WORKERS)
+        # One connection per worker, reused across calls.
+        self.assertEqual(len({conn for _, conn, _ in results}), len(threads))
+
+    def test_board(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('task_list'))
+        self.assertContains(response, 'Task 2')
+
+
+class AttachmentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('files', password='secret')
+        cls.member = Member.objects.create(name='Ada')
+        cls.incident = Task.objects.create(name='Incident')
+        cls.follow_up = Task.objects.create(name='Follow-up')
+
+    def setUp(self):
+        lookups.invalidate()
+        self.client.force_login(self.user)
+        root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(mock.patch.multiple(
+            attachments, ATTACHMENT_DIR=root, BLOB_DIR=root / 'blobs', UPLOAD_DIR=root / 'uploads',
+        ))
+
+    def upload(self, task, content=b'0123456789'):
+        response = self.client.post(reverse('upload_attachment', args=[task.pk]), {
+            'file': SimpleUploadedFile('bundle.log', content, 'text/plain'),
+            'uploaded_by': self.member.pk,
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        return TaskAttachment.objects.get(pk=response.json()['attachment']['id'])
+
+    def test_identical_uploads_share_a_blob(self):
+        first, second = self.upload(self.incident), self.upload(self.follow_up)
+        self.assertEqual(first.sha256, second.sha256)
+        self.assertEqual(first.file_size, 10)
+        self.assertEqual(len(list(attachments.BLOB_DIR.glob('*/*/*'))), 1)
+        self.assertEqual(list(attachments.UPLOAD_DIR.iterdir()), [])
+
+    def test_range_download(self):
+        url = reverse('download_attachment', args=[self.upload(self.incident).pk])
+        response = self.client.get(url)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        response = self.client.get(url, headers={'Range': 'bytes=2-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        response = self.client.get(url, headers={'Range': 'bytes=-3'})
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        self.assertEqual(self.client.get(url, headers={'Range': 'bytes=10-'}).status_code, 416)
+        # A changed file (different validator) gets the whole file.
+        response = self.client.get(url, headers={'Range': 'bytes=2-5', 'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_sweep_keeps_referenced_blobs(self):
+        first, second = self.upload(self.incident), self.upload(self.follow_up)
+        first.delete()
+        self.assertEqual(attachments.sweep(grace=-1), (0, 0))
+        second.delete()
+        self.assertEqual(attachments.sweep(grace=-1), (1, 10))
+        self.assertFalse(attachments.blob_path(second.sha256).exists())
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('etag', password='secret')
+        cls.member = Member.objects.create(name='Ada')
+        status = Status.objects.create(name='To Do')
+        cls.task = Task.objects.create(name='Watched', status=status)
+        cls.other = Task.objects.create(name='Other', status=status)
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+        self.client.force_login(self.user)
+
+    def assertRevalidates(self, url, change, queries=3):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(queries):  # session, user, validators
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_board_changes_with_any_task(self):
+        url = reverse('task_list')
+        # The board also checks the user's saved filters.
+        self.assertRevalidates(url, lambda: Task.objects.get(pk=self.other.pk).save(), queries=4)
+        self.assertRevalidates(url, lambda: bulk.apply_action([self.other.pk], 'delete'), queries=4)
+
+    def test_board_changes_with_saved_filters(self):
+        # The board lists all of the user's filters, not just the open one.
+        url = reverse('task_list')
+        saved = SavedFilter.objects.create(user=self.user, name='Mine', params={'search_in': 'name'})
+        self.assertRevalidates(url, lambda: SavedFilter.objects.create(
+            user=self.user, name='New', params={'search_in': 'name'},
+        ), queries=4)
+        self.assertRevalidates(url, lambda: SavedFilter.objects.filter(pk=saved.pk).delete(), queries=4)
+
+    def test_pending_messages_are_not_revalidated(self):
+        url = reverse('task_list')
+        etag = self.client.get(url)['ETag']
+        # A rejected filter name leaves an error message for the next page.
+        self.client.post(reverse('save_filter'), {'name': ''})
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertContains(response, 'Filter names must be 1 to 100 characters.')
+        self.assertNotIn('ETag', response)
+        # Shown once; after that the board is cacheable again.
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', STUB_TEMPLATES)]},
+    }])
+    def test_detail_and_dashboard(self):
+        url = reverse('task_detail', args=[self.task.pk])
+        self.assertRevalidates(url, lambda: TaskComment.objects.create(
+            task=self.task, author=self.member, content='Seen',
+        ))
+        # Async login_required loads the user through request.auser(), and
+        # the validators through request.user.
+        self.assertRevalidates(reverse('dashboard'), lambda: Task.objects.create(name='New'), queries=4)
+
+    def test_anonymous_requests_are_not_revalidated(self):
+        etag = self.client.get(reverse('task_list'))['ETag']
+        self.client.logout()
+        response = self.client.get(reverse('task_list'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 302)
+
+
+class SavedFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('saver', password='secret')
+        status = Status.objects.create(name='To Do')
+        cls.high = Priority.objects.create(name='High', level=3)
+        cls.low = Priority.objects.create(name='Low', level=1)
+        cls.urgent = Task.objects.create(name='Urgent', status=status, priority=cls.high)
+        cls.later = Task.objects.create(name='Later', status=status, priority=cls.low)
+        cls.saved = SavedFilter.objects.create(
+            user=cls.user, name='High priority',
+            params={'search_in': 'name', 'priority': str(cls.high.pk)},
+        )
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+
+    def test_task_writes_update_the_cached_set(self):
+        self.assertEqual(saved_filters.task_ids(self.saved), {self.urgent.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.later.priority = self.high
+            self.later.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(saved_filters.task_ids(self.saved), {self.urgent.pk, self.later.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.apply_action([self.urgent.pk], 'change_priority', priority=self.low)
+        self.assertEqual(saved_filters.task_ids(self.saved), {self.later.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.apply_action([self.later.pk], 'delete')
+        self.assertEqual(saved_filters.task_ids(self.saved), set())
+
+    def test_writes_check_all_cached_filters_in_one_query(self):
+        other = User.objects.create_user('other')
+        filters = [self.saved] + [
+            SavedFilter.objects.create(user=user, name=name, params=params)
+            for user, name, params in [
+                (self.user, 'Low', {'search_in': 'name', 'priority': str(self.low.pk)}),
+                (other, 'Search', {'search_in': 'all', 'search_query': 'later'}),
+                (other, 'Everything', {}),
+            ]
+        ]
+        for saved in filters:
+            saved_filters.task_ids(saved)
+
+        Task.objects.filter(pk=self.later.pk).update(priority=self.high)
+        with self.assertNumQueries(2):  # the filter ids, then one UNION ALL
+            saved_filters.record_changes([self.later.pk])
+        self.assertEqual(
+            [saved_filters.task_ids(saved) for saved in filters],
+            [{self.urgent.pk, self.later.pk}, set(), {self.later.pk}, {self.urgent.pk, self.later.pk}],
+        )
+
+    def test_board_opens_saved_filter(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('task_list'), {'saved': self.saved.pk})
+        self.assertEqual([task.pk for task in response.context['tasks']], [self.urgent.pk])
+        self.assertEqual(response.context['search_form'].data, self.saved.params)
+
+        other = User.objects.create_user('other')
+        self.client.force_login(other)
+        response = self.client.get(reverse('task_list'), {'saved': self.saved.pk})
+        self.assertEqual(response.status_code, 404)
+
+    def test_save_filter_stores_search_params(self):
+        self.client.force_login(self.user)
+        url = reverse('save_filter') + f'?search_in=name&priority={self.low.pk}&cursor=abc'
+        response = self.client.post(url, {'name': 'Low priority'})
+        saved = SavedFilter.objects.get(user=self.user, name='Low priority')
+        self.assertRedirects(response, reverse('task_list') + f'?saved={saved.pk}')
+        self.assertEqual(saved.params, {'search_in': 'name', 'priority': str(self.low.pk)})
+        self.assertEqual(saved_filters.task_ids(saved), {self.later.pk})
+
+
+class FacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('facets', password='secret')
+        cls.todo = Status.objects.create(name='To Do', order=1)
+        cls.done = Status.objects.create(name='Done', order=2, is_completed=True)
+        cls.ops = Category.objects.create(name='Ops')
+        cls.dev = Category.objects.create(name='Dev')
+        yesterday = timezone.now() - timedelta(days=1)
+        for name, status, category, due_date in [
+            ('Rotate keys', cls.todo, cls.ops, yesterday),
+            ('Patch hosts', cls.todo, cls.ops, None),
+            ('Ship API', cls.todo, cls.dev, yesterday),
+            ('Old release', cls.done, cls.dev, yesterday),
+        ]:
+            Task.objects.create(name=name, status=status, category=category, due_date=due_date)
+
+    def setUp(self):
+        cache.clear()
+        lookups.invalidate()
+
+    def test_counts_apply_other_dimensions_only(self):
+        params = {'search_in': 'name', 'status': str(self.todo.pk), 'category': str(self.ops.pk)}
+        TaskSearchForm(params).is_valid()  # load the lookups
+        lookups.get_all(Status)
+        with self.assertNumQueries(1):
+            counts = facets.get_facets(params)
+        # Each dimension ignores its own choice, so its alternatives stay visible.
+        self.assertEqual(counts['status'], {self.todo.pk: 2})
+        self.assertEqual(counts['category'], {self.ops.pk: 2, self.dev.pk: 1})
+        self.assertEqual(counts['assigned_to'], {None: 2})
+        self.assertEqual(counts['overdue'], 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(facets.get_facets(dict(reversed(params.items()))), counts)
+
+        overdue = facets.get_facets({'search_in': 'name', 'show_overdue': 'on'})
+        self.assertEqual(overdue['category'], {self.ops.pk: 1, self.dev.pk: 1})
+        self.assertEqual(overdue['overdue'], 2)
+
+    def test_board_shows_counts(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('task_list'), {'search_in': 'name', 'category': self.dev.pk})
+        self.assertContains(response, 'Ops (2)</option>')
+        self.assertContains(response, 'Done (1)</option>')
+        self.assertContains(response, 'Overdue Only (1)')
+
+
+class BenchmarkTests(TestCase):
+
+    def test_task_ids_exist(self):
+        tasks = [Task.objects.create(name=f'Task {i}') for i in range(10)]
+        for task in tasks[::2]:
+            task.delete()
+        benchmarks._existing_task_ids.cache_clear()
+        ids = benchmarks._task_ids(random.Random(0), 50)
+        self.assertEqual(len(ids), 50)
+        self.assertLessEqual(set(ids), {task.pk for task in tasks[1::2]})
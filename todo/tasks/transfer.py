@@ -0,0 +1,257 @@
+"""
+Streaming import and export of tasks as CSV or JSON Lines.
+
+Related objects are written and read by name, so a file exported from one
+environment can be loaded into another. Both directions work on generators
+and fixed-size chunks, so memory use does not grow with the number of tasks.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import saved_filters, stats
+from .models import Category, Member, Priority, Status, Tag, Task, TaskTag
+
+FORMATS = ('csv', 'jsonl')
+
+FIELDS = [
+    'name', 'description', 'category', 'assigned_to', 'status', 'priority',
+    'created_at', 'due_date', 'completed_at', 'estimated_hours',
+    'actual_hours', 'tags', 'is_archived',
+]
+
+
+class RowError(Exception):
+    pass
+
+
+# Export
+
+def export_rows(queryset, chunk_size=2000):
+    """Yield each task of ``queryset`` as a flat dict of ``FIELDS``."""
+    queryset = queryset.select_related('category', 'assigned_to', 'status', 'priority')
+    for task in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'name': task.name,
+            'description': task.description,
+            'category': task.category.name if task.category else '',
+            'assigned_to': task.assigned_to.name if task.assigned_to else '',
+            'status': task.status.name if task.status else '',
+            'priority': task.priority.name if task.priority else '',
+            'created_at': _isoformat(task.created_at),
+            'due_date': _isoformat(task.due_date),
+            'completed_at': _isoformat(task.completed_at),
+            'estimated_hours': _decimal(task.estimated_hours),
+            'actual_hours': _decimal(task.actual_hours),
+            'tags': task.tags,
+            'is_archived': task.is_archived,
+        }
+
+
+def render_rows(rows, format):
+    """Yield ``rows`` encoded as lines of CSV (with a header) or JSON Lines."""
+    if format == 'csv':
+        buffer = _LineBuffer()
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+    elif format == 'jsonl':
+        for row in rows:
+            yield json.dumps(row) + '\n'
+    else:
+        raise ValueError(f'Unknown format {format!r}')
+
+
+class _LineBuffer:
+    """A file-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _isoformat(value):
+    return value.isoformat() if value else ''
+
+
+def _decimal(value):
+    return str(value) if value is not None else ''
+
+
+# Import
+
+def read_rows(lines, format):
+    """Yield dicts from an iterable of CSV or JSON Lines text lines.
+
+    A JSON line that does not parse is yielded as a ``RowError``, so the
+    importer records it and carries on with the next line.
+    """
+    if format == 'csv':
+        yield from csv.DictReader(lines)
+    elif format == 'jsonl':
+        for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield RowError(f'Invalid JSON: {e}')
+    else:
+        raise ValueError(f'Unknown format {format!r}')
+
+
+class _NameLookup:
+    """Name -> primary key cache for a small reference table.
+
+    The whole table is loaded on first use; names that do not exist yet are
+    created (except priorities, whose level must be chosen by a person).
+    """
+
+    def __init__(self, model, create=True):
+        self.model = model
+        self.create = create
+        self.ids = None
+
+    def __call__(self, name):
+        name = _text(self.model, 'name', name).strip()
+        if not name:
+            return None
+        if self.ids is None:
+            self.ids = dict(self.model.objects.values_list('name', 'pk'))
+        if name not in self.ids:
+            if not self.create:
+                raise RowError(f'Unknown {self.model._meta.verbose_name} "{name}"')
+            self.ids[name] = self.model.objects.create(name=name).pk
+        return self.ids[name]
+
+
+class TaskImporter:
+    """Create tasks from dicts of ``FIELDS`` with chunked ``bulk_create``.
+
+    ``errors`` collects ``(row number, message)`` for rows that were skipped.
+    """
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.categories = _NameLookup(Category)
+        self.members = _NameLookup(Member)
+        self.statuses = _NameLookup(Status)
+        self.priorities = _NameLookup(Priority, create=False)
+        self.tag_ids = {}
+        self.created = 0
+        self.errors = []
+
+    def run(self, rows):
+        rows = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk)
+        stats.invalidate()
+        saved_filters.invalidate()
+        return self.created
+
+    def _import_chunk(self, chunk):
+        tasks = []
+        created_at = []
+        for number, row in chunk:
+            try:
+                task, row_created_at = self._build(row)
+            except ValidationError as e:
+                self.errors.append((number, ' '.join(e.messages)))
+                continue
+            except (RowError, ValueError, TypeError) as e:
+                self.errors.append((number, str(e)))
+                continue
+            tasks.append(task)
+            created_at.append(row_created_at)
+
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+            # auto_now_add overwrites created_at on insert; restore the
+            # exported timestamps in one statement per chunk.
+            restored = [When(pk=task.pk, then=value) for task, value in zip(tasks, created_at) if value]
+            if restored:
+                Task.objects.filter(pk__in=[task.pk for task in tasks]).update(
+                    created_at=Case(*restored, default='created_at')
+                )
+            self._create_tags(tasks)
+        self.created += len(tasks)
+
+    def _build(self, row):
+        if isinstance(row, RowError):
+            raise row
+        if not isinstance(row, dict):
+            raise RowError('Expected an object of task fields')
+        name = _text(Task, 'name', row.get('name')).strip()
+        if not name:
+            raise RowError('Missing name')
+        task = Task(
+            name=name,
+            description=_text(Task, 'description', row.get('description')),
+            category_id=self.categories(row.get('category')),
+            assigned_to_id=self.members(row.get('assigned_to')),
+            status_id=self.statuses(row.get('status')),
+            priority_id=self.priorities(row.get('priority')),
+            due_date=_parse_datetime(row.get('due_date')),
+            completed_at=_parse_datetime(row.get('completed_at')),
+            estimated_hours=_parse_decimal('estimated_hours', row.get('estimated_hours')),
+            actual_hours=_parse_decimal('actual_hours', row.get('actual_hours')),
+            tags=_text(Task, 'tags', row.get('tags')),
+            is_archived=_parse_bool(row.get('is_archived')),
+        )
+        return task, _parse_datetime(row.get('created_at'))
+
+    def _create_tags(self, tasks):
+        names = {name for task in tasks for name in Task.parse_tags(task.tags)}
+        missing = names - self.tag_ids.keys()
+        if missing:
+            Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+            self.tag_ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'pk'))
+        TaskTag.objects.bulk_create([
+            TaskTag(task_id=task.pk, tag_id=self.tag_ids[name])
+            for task in tasks
+            for name in Task.parse_tags(task.tags)
+        ])
+
+
+def _text(model, field_name, value):
+    """``value`` as a string, rejected if it is too long for ``model.field_name``."""
+    text = '' if value is None else str(value)
+    max_length = model._meta.get_field(field_name).max_length
+    if max_length and len(text) > max_length:
+        raise RowError(f'{model._meta.verbose_name} {field_name} is longer than {max_length} characters')
+    return text
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'Invalid date/time "{value}"')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_decimal(field_name, value):
+    """``value`` as a Decimal that fits the field's ``max_digits`` and ``decimal_places``."""
+    if value in (None, ''):
+        return None
+    try:
+        return Task._meta.get_field(field_name).clean(value, None)
+    except ValidationError as e:
+        raise RowError(f'{field_name}: {" ".join(e.messages)}')
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'y')
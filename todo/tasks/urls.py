@@ -1,7 +1,10 @@
 from django.urls import path
 from .views import (
     TaskList, TaskDetail, TaskCreate, TaskUpdate, TaskDelete,
-    update_task_status, add_comment, dashboard, bulk_actions
+    update_task_status, add_comment, dashboard, bulk_actions, task_list_api,
+    move_tasks, export_tasks, task_events, metrics_api, job_status, job_download,
+    task_comments, task_attachments, upload_attachment, download_attachment,
+    save_filter, delete_saved_filter
 )
 
 urlpatterns = [
@@ -12,6 +15,19 @@ urlpatterns = [
     path('task/<int:pk>/edit/', TaskUpdate.as_view(), name='task_update'),
     path('task/<int:pk>/delete/', TaskDelete.as_view(), name='task_delete'),
     path('task/<int:task_id>/comment/', add_comment, name='add_comment'),
+    path('task/<int:pk>/comments/', task_comments, name='task_comments'),
+    path('task/<int:pk>/attachments/', task_attachments, name='task_attachments'),
+    path('task/<int:task_id>/attachments/upload/', upload_attachment, name='upload_attachment'),
+    path('attachments/<int:pk>/download/', download_attachment, name='download_attachment'),
+    path('filters/save/', save_filter, name='save_filter'),
+    path('filters/<int:pk>/delete/', delete_saved_filter, name='delete_saved_filter'),
     path('update-task-status/', update_task_status, name='update_task_status'),
+    path('move-tasks/', move_tasks, name='move_tasks'),
     path('bulk-actions/', bulk_actions, name='bulk_actions'),
+    path('api/tasks/', task_list_api, name='task_list_api'),
+    path('events/', task_events, name='task_events'),
+    path('api/metrics/', metrics_api, name='metrics_api'),
+    path('export/', export_tasks, name='export_tasks'),
+    path('jobs/<int:pk>/', job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', job_download, name='job_download'),
 ]
\ No newline at end of file
@@ -1,90 +1,109 @@
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.shortcuts import redirect, get_object_or_404, render
+from django.shortcuts import redirect, get_object_or_404
+from django.template.response import TemplateResponse
 from django.urls import reverse_lazy, reverse
 from django.contrib import messages
-from django.db.models import Q, Count
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from django.db.models import Count
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST
+from django.utils import timezone
 from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 import json
-from datetime import datetime, timedelta
-from .models import Task, Status, Member, Category, Priority, TaskComment
+import copy
+from datetime import date, timedelta
+from functools import partial
+from . import activity, archive, attachments, events, facets, jobs, lookups, metrics, saved_filters, stats
+from .board import CARD_CACHE_TTL, build_board, fragment_version
+from .bulk import ACTIONS, INLINE_LIMIT, apply_action
+from .concurrency import gather, run_concurrently
+from .conditional import board_etag, conditional, dashboard_etag, task_etag
+from .database import read_only
+from .filters import filter_tasks, search_params, task_queryset
+from .models import (
+    Task, Status, Member, Category, Priority, Tag, TaskAttachment, TaskComment, Job, SavedFilter
+)
 from .forms import (
     MemberForm, StatusForm, TaskForm, CategoryForm, 
-    PriorityForm, TaskCommentForm, TaskSearchForm
+    PriorityForm, TaskAttachmentForm, TaskCommentForm, TaskSearchForm
 )
+from .moves import MAX_MOVES, Move, UnknownStatus, apply_moves
+from .pagination import CursorPaginator, InvalidCursor
+from .search import rank_ordering
+from .serializers import serialize_attachment, serialize_comment, serialize_task
+from .transfer import FORMATS, export_rows, render_rows
 
 
+@method_decorator(read_only, name='dispatch')
+@method_decorator(conditional(board_etag), name='dispatch')
 class TaskList(LoginRequiredMixin, ListView):
     model = Task
     template_name = 'task_list.html'
     context_object_name = 'tasks'
     paginate_by = 20
+    column_limit = 50
+
+    @cached_property
+    def saved_filter(self):
+        """The user's saved filter named by ``?saved=<pk>``, if any."""
+        pk = self.request.GET.get('saved')
+        if not pk:
+            return None
+        try:
+            return self.request.user.saved_filters.get(pk=pk)
+        except (SavedFilter.DoesNotExist, ValueError):
+            raise Http404('Saved filter not found')
+
+    @property
+    def filter_params(self):
+        return self.saved_filter.params if self.saved_filter else self.request.GET
 
     def get_queryset(self):
-        queryset = Task.objects.select_related(
-            'category', 'assigned_to', 'status', 'priority'
-        ).filter(is_archived=False)
-        
-        # Apply search and filters
-        form = TaskSearchForm(self.request.GET)
-        if form.is_valid():
-            search_query = form.cleaned_data.get('search_query')
-            search_in = form.cleaned_data.get('search_in')
-            category = form.cleaned_data.get('category')
-            status = form.cleaned_data.get('status')
-            priority = form.cleaned_data.get('priority')
-            assigned_to = form.cleaned_data.get('assigned_to')
-            due_date_from = form.cleaned_data.get('due_date_from')
-            due_date_to = form.cleaned_data.get('due_date_to')
-            show_overdue = form.cleaned_data.get('show_overdue')
-            show_archived = form.cleaned_data.get('show_archived')
-            
-            if search_query:
-                if search_in == 'name':
-                    queryset = queryset.filter(name__icontains=search_query)
-                elif search_in == 'description':
-                    queryset = queryset.filter(description__icontains=search_query)
-                elif search_in == 'tags':
-                    queryset = queryset.filter(tags__icontains=search_query)
-                elif search_in == 'assigned_to':
-                    queryset = queryset.filter(assigned_to__name__icontains=search_query)
-            
-            if category:
-                queryset = queryset.filter(category=category)
-            if status:
-                queryset = queryset.filter(status=status)
-            if priority:
-                queryset = queryset.filter(priority=priority)
-            if assigned_to:
-                queryset = queryset.filter(assigned_to=assigned_to)
-            if due_date_from:
-                queryset = queryset.filter(due_date__gte=due_date_from)
-            if due_date_to:
-                queryset = queryset.filter(due_date__lte=due_date_to)
-            if show_overdue:
-                queryset = queryset.filter(due_date__lt=datetime.now())
-            if show_archived:
-                queryset = Task.objects.select_related(
-                    'category', 'assigned_to', 'status', 'priority'
-                ).all()
-        
-        return queryset.order_by('-created_at')
+        if self.saved_filter:
+            task_ids = saved_filters.task_ids(self.saved_filter)
+            if task_ids is not None:
+                # Newest first: the cached set carries no search rank
+                return task_queryset().filter(pk__in=task_ids).order_by('-created_at', '-id')
+        queryset = filter_tasks(self.filter_params)
+        return queryset.order_by(*rank_ordering(queryset))
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(
+            queryset, page_size, ordering=rank_ordering(queryset), count='approximate'
+        )
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return (paginator, page, page.object_list, page.has_other_pages())
 
     def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        
-        # Statuses and tasks grouped by status for kanban view
-        statuses = Status.objects.all().order_by('order', 'name')
-        status_tasks = []
+        statuses = lookups.get_all(Status)
         
-        for status in statuses:
-            tasks = self.get_queryset().filter(status=status)
-            status_tasks.append((status, tasks))
+        # The page, the kanban columns, the tag cloud and the statistics are
+        # independent, so their queries run concurrently
+        context, board, popular_tags, task_stats, archived_tasks, facet_counts = run_concurrently(
+            partial(super().get_context_data, **kwargs),
+            partial(build_board, self.object_list, statuses, per_column_limit=self.column_limit),
+            lambda: list(Tag.objects.annotate(
+                task_count=Count('task_tags')
+            ).filter(task_count__gt=0).order_by('-task_count', 'name')[:20]),
+            stats.get_stats,
+            partial(archive.search_archived, self.filter_params, limit=self.column_limit),
+            partial(facets.get_facets, self.filter_params),
+        )
         
-        context['status_tasks'] = status_tasks
+        # Statuses and tasks grouped by status for kanban view
+        context['status_tasks'] = board
+        # Matches from cold storage when archived tasks are included
+        context['archived_tasks'] = archived_tasks
+        context['card_cache_ttl'] = CARD_CACHE_TTL
+        context['fragment_version'] = fragment_version()
+        context['live_updates'] = events.live_updates(self.request)
         
         # Forms and data for modals
         context['task_form'] = TaskForm()
@@ -92,21 +111,23 @@ class TaskList(LoginRequiredMixin, ListView):
         context['assignee_form'] = MemberForm()
         context['status_form'] = StatusForm()
         context['priority_form'] = PriorityForm()
-        context['search_form'] = TaskSearchForm(self.request.GET)
+        context['search_form'] = TaskSearchForm(self.filter_params)
+        context['search_form'].set_facets(facet_counts)
+        context['saved_filters'] = list(self.request.user.saved_filters.all())
+        context['saved_filter'] = self.saved_filter
+        context['filter_query'] = urlencode(search_params(self.filter_params))
         
         # Additional context
-        context['assignees'] = Member.objects.all().order_by('name')
+        context['assignees'] = lookups.get_all(Member)
         context['statuses'] = statuses
-        context['categories'] = Category.objects.all().order_by('name')
-        context['priorities'] = Priority.objects.all().order_by('level')
+        context['categories'] = lookups.get_all(Category)
+        context['priorities'] = lookups.get_all(Priority)
+        context['popular_tags'] = popular_tags
         
         # Statistics
-        context['total_tasks'] = Task.objects.count()
-        context['completed_tasks'] = Task.objects.filter(status__is_completed=True).count()
-        context['overdue_tasks'] = Task.objects.filter(
-            due_date__lt=datetime.now(),
-            status__is_completed=False
-        ).count()
+        context['total_tasks'] = task_stats['total_tasks']
+        context['completed_tasks'] = task_stats['completed_tasks']
+        context['overdue_tasks'] = task_stats['overdue_tasks']
         
         return context
 
@@ -174,15 +195,34 @@ class TaskList(LoginRequiredMixin, ListView):
         return redirect('task_list')
 
 
+@method_decorator(read_only, name='dispatch')
+@method_decorator(conditional(task_etag), name='dispatch')
 class TaskDetail(LoginRequiredMixin, DetailView):
     model = Task
     template_name = 'task_detail.html'
     context_object_name = 'task'
     
+    def get_queryset(self):
+        return task_queryset()
+    
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            # Archived tasks may have been moved to cold storage
+            task = archive.get_task(self.kwargs['pk'])
+            if task is None:
+                raise
+            return task
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['comment_form'] = TaskCommentForm()
-        context['comments'] = self.object.comments.all()
+        # Only the newest page of each; older ones load from task_comments
+        # and task_attachments with the page's next_cursor
+        context['comments'] = activity.comment_page(self.object)
+        context['attachments'] = activity.attachment_page(self.object)
+        context['comment_count'] = self.object.comment_count
         return context
 
 
@@ -235,31 +275,104 @@ def add_comment(request, task_id):
     return redirect('task_detail', pk=task_id)
 
 
+@csrf_exempt
+@login_required
+@require_POST
+def upload_attachment(request, task_id):
+    """Attach an uploaded file to a task, streamed to disk as it arrives"""
+    # Must be set before anything reads the body, which is why CSRF is
+    # checked by _upload_attachment rather than the middleware.
+    request.upload_handlers = [attachments.HashingUploadHandler(request)]
+    return _upload_attachment(request, task_id)
+
+
+@csrf_protect
+def _upload_attachment(request, task_id):
+    task = get_object_or_404(Task, id=task_id)
+    form = TaskAttachmentForm(request.POST, request.FILES)
+    if not form.is_valid():
+        for upload in request.FILES.values():
+            attachments.discard(upload)
+        return JsonResponse({
+            'success': False,
+            'errors': form.errors
+        }, status=400)
+    
+    attachment = attachments.attach(task, form.cleaned_data['file'], form.cleaned_data['uploaded_by'])
+    return JsonResponse({
+        'success': True,
+        'attachment': serialize_attachment(attachment),
+        'url': reverse('download_attachment', args=[attachment.pk]),
+    }, status=201)
+
+
+@login_required
+def download_attachment(request, pk):
+    """Attachment contents, with Range support for resuming large downloads"""
+    attachment = TaskAttachment.objects.filter(pk=pk).first() or archive.get_attachment(pk)
+    if attachment is None:
+        raise Http404('No attachment found')
+    response = attachments.serve(request, attachment)
+    if response is None:
+        raise Http404('Attachment file is missing')
+    return response
+
+
+@login_required
+@require_POST
+def save_filter(request):
+    """Save the filters in the query string under the posted name."""
+    name = request.POST.get('name', '').strip()
+    if not name or len(name) > 100:
+        messages.error(request, 'Filter names must be 1 to 100 characters.')
+        return redirect(f"{reverse('task_list')}?{request.GET.urlencode()}")
+    saved, created = SavedFilter.objects.update_or_create(
+        user=request.user, name=name,
+        defaults={'params': search_params(request.GET)},
+    )
+    messages.success(request, f'Filter "{saved.name}" saved.')
+    return redirect(f"{reverse('task_list')}?saved={saved.pk}")
+
+
+@login_required
+@require_POST
+def delete_saved_filter(request, pk):
+    saved = get_object_or_404(SavedFilter, pk=pk, user=request.user)
+    saved.delete()
+    messages.success(request, f'Filter "{saved.name}" deleted.')
+    return redirect('task_list')
+
+
 @csrf_exempt
 def update_task_status(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            task_id = data.get('task_id')
-            status_id = data.get('status_id')
-            
-            task = get_object_or_404(Task, pk=task_id)
-            status = get_object_or_404(Status, pk=status_id)
-            
-            old_status = task.status
-            task.status = status
-            task.save()
+            move = Move(
+                int(data.get('task_id')),
+                int(data.get('status_id')),
+                int(data['version']) if data.get('version') is not None else None,
+            )
+            results, conflicts = apply_moves([move])
             
-            # Mark as completed if status is completed
-            if status.is_completed:
-                task.mark_completed()
+            if conflicts:
+                conflict = conflicts[0]
+                return JsonResponse({
+                    'success': False,
+                    'error': conflict.error,
+                    'version': conflict.version
+                }, status=409 if conflict.version is not None else 400)
             
+            result = results[0]
             return JsonResponse({
                 'success': True,
-                'message': f'Task "{task.name}" moved to {status.name}'
+                'message': f'Task "{result.name}" moved to {result.status.name}',
+                'version': result.version
             })
             
-        except (Task.DoesNotExist, Status.DoesNotExist):
+        except UnknownStatus as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        except (TypeError, ValueError):
             return JsonResponse({
                 'success': False, 
                 'error': 'Invalid task or status ID'
@@ -277,82 +390,338 @@ def update_task_status(request):
 
 
 @login_required
-def dashboard(request):
+@require_POST
+def move_tasks(request):
+    """Apply a batch of kanban moves: {"moves": [{task_id, status_id, version}]}"""
+    try:
+        data = json.loads(request.body)
+        moves = [
+            Move(
+                int(item['task_id']),
+                int(item['status_id']),
+                int(item['version']) if item.get('version') is not None else None,
+            )
+            for item in data['moves']
+        ]
+    except (TypeError, ValueError, KeyError):
+        return JsonResponse({
+            'success': False,
+            'error': 'Expected {"moves": [{"task_id", "status_id", "version"}]}'
+        }, status=400)
+    
+    if len(moves) > MAX_MOVES:
+        return JsonResponse({
+            'success': False,
+            'error': f'At most {MAX_MOVES} moves per request'
+        }, status=400)
+    
+    try:
+        results, conflicts = apply_moves(moves)
+    except UnknownStatus as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse({
+        'success': not conflicts,
+        'moved': [
+            {'task_id': result.task_id, 'status_id': result.status.pk, 'version': result.version}
+            for result in results
+        ],
+        'conflicts': [conflict._asdict() for conflict in conflicts],
+    }, status=409 if conflicts else 200)
+
+
+@login_required
+@read_only
+@conditional(dashboard_etag)
+async def dashboard(request):
     """Dashboard view with statistics and charts"""
     context = {}
     
-    # Task statistics
-    total_tasks = Task.objects.count()
-    completed_tasks = Task.objects.filter(status__is_completed=True).count()
-    overdue_tasks = Task.objects.filter(
-        due_date__lt=datetime.now(),
-        status__is_completed=False
-    ).count()
+    def status_counts():
+        return [copy.copy(status) for status in lookups.get_all(Status)]
+    
+    def priority_counts():
+        return [copy.copy(priority) for priority in lookups.get_all(Priority)]
+    
+    now = timezone.now()
+    
+    def recent_tasks():
+        return list(Task.objects.select_related(
+            'status', 'priority', 'assigned_to'
+        ).with_due_dates(now).order_by('-created_at')[:10])
+    
+    def upcoming_deadlines():
+        return list(Task.objects.with_due_dates(now).filter(
+            due_date__gte=now,
+            due_date__lte=now + timedelta(days=7),
+            status__is_completed=False
+        ).order_by('due_date'))
+    
+    # The sections are independent, so their queries run concurrently
+    task_stats, status_counts, priority_counts, recent_tasks, upcoming_deadlines = await gather(
+        stats.get_stats, status_counts, priority_counts, recent_tasks, upcoming_deadlines
+    )
     
     # Tasks by status
-    status_counts = Status.objects.annotate(
-        task_count=Count('tasks')
-    ).order_by('order')
+    for status in status_counts:
+        status.task_count = task_stats['status_counts'].get(status.pk, 0)
     
     # Tasks by priority
-    priority_counts = Priority.objects.annotate(
-        task_count=Count('tasks')
-    ).order_by('level')
-    
-    # Recent tasks
-    recent_tasks = Task.objects.select_related(
-        'status', 'priority', 'assigned_to'
-    ).order_by('-created_at')[:10]
-    
-    # Upcoming deadlines
-    upcoming_deadlines = Task.objects.filter(
-        due_date__gte=datetime.now(),
-        due_date__lte=datetime.now() + timedelta(days=7),
-        status__is_completed=False
-    ).order_by('due_date')
+    for priority in priority_counts:
+        priority.task_count = task_stats['priority_counts'].get(priority.pk, 0)
     
     context.update({
-        'total_tasks': total_tasks,
-        'completed_tasks': completed_tasks,
-        'overdue_tasks': overdue_tasks,
+        'total_tasks': task_stats['total_tasks'],
+        'completed_tasks': task_stats['completed_tasks'],
+        'overdue_tasks': task_stats['overdue_tasks'],
         'status_counts': status_counts,
         'priority_counts': priority_counts,
         'recent_tasks': recent_tasks,
         'upcoming_deadlines': upcoming_deadlines,
     })
     
-    return render(request, 'dashboard.html', context)
+    return TemplateResponse(request, 'dashboard.html', context)
 
 
 @login_required
 def bulk_actions(request):
-    """Handle bulk actions on tasks"""
+    """Handle bulk actions on tasks; large selections run as a background job"""
     if request.method == 'POST':
         action = request.POST.get('action')
         task_ids = request.POST.getlist('task_ids')
         
-        if action and task_ids:
-            tasks = Task.objects.filter(id__in=task_ids)
-            
-            if action == 'delete':
-                tasks.delete()
-                messages.success(request, f'{len(task_ids)} tasks deleted successfully!')
-            elif action == 'archive':
-                tasks.update(is_archived=True)
-                messages.success(request, f'{len(task_ids)} tasks archived successfully!')
-            elif action == 'change_status':
-                status_id = request.POST.get('status_id')
-                if status_id:
-                    status = get_object_or_404(Status, id=status_id)
-                    tasks.update(status=status)
-                    messages.success(request, f'{len(task_ids)} tasks status updated successfully!')
+        if action in ACTIONS and task_ids:
+            status = priority = None
+            if action == 'change_status':
+                if not request.POST.get('status_id'):
+                    return redirect('task_list')
+                status = get_object_or_404(Status, id=request.POST['status_id'])
             elif action == 'change_priority':
-                priority_id = request.POST.get('priority_id')
-                if priority_id:
-                    priority = get_object_or_404(Priority, id=priority_id)
-                    tasks.update(priority=priority)
-                    messages.success(request, f'{len(task_ids)} tasks priority updated successfully!')
+                if not request.POST.get('priority_id'):
+                    return redirect('task_list')
+                priority = get_object_or_404(Priority, id=request.POST['priority_id'])
+            
+            if len(task_ids) > INLINE_LIMIT:
+                job = jobs.enqueue('bulk_action', {
+                    'action': action,
+                    'task_ids': task_ids,
+                    'status_id': status.pk if status else None,
+                    'priority_id': priority.pk if priority else None,
+                }, user=request.user)
+                messages.success(request, f'{len(task_ids)} tasks queued for processing (job #{job.pk})')
+            else:
+                apply_action(task_ids, action, status=status, priority=priority)
+                done = {
+                    'delete': 'deleted',
+                    'archive': 'archived',
+                    'change_status': 'status updated',
+                    'change_priority': 'priority updated',
+                }[action]
+                messages.success(request, f'{len(task_ids)} tasks {done} successfully!')
         
         return redirect('task_list')
     
-    return redirect('task_list')
\ No newline at end of file
+    return redirect('task_list')
+
+
+@login_required
+async def task_events(request):
+    """Server-Sent Events stream of task changes (needs the ASGI server)"""
+    if not events.live_updates(request):
+        return HttpResponse(status=204)
+    backend = events.get_backend()
+    subscription = backend.subscribe()
+    
+    async def event_stream():
+        try:
+            async for chunk in events.stream(subscription):
+                yield chunk
+        finally:
+            backend.unsubscribe(subscription)
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _invalid_filters(params):
+    """A 400 response listing the errors in search parameters, or None if they are valid"""
+    form = TaskSearchForm(params)
+    if form.is_valid():
+        return None
+    return JsonResponse({
+        'success': False,
+        'error': 'Invalid filters',
+        'errors': form.errors,
+    }, status=400)
+
+
+@login_required
+def task_list_api(request):
+    """JSON task listing with cursor pagination, using the board's filters"""
+    invalid = _invalid_filters(request.GET)
+    if invalid:
+        return invalid
+    queryset = filter_tasks(request.GET)
+    
+    try:
+        page_size = min(max(int(request.GET.get('page_size', 50)), 1), 200)
+    except ValueError:
+        page_size = 50
+    count = request.GET.get('count')
+    if count not in ('exact', 'approximate'):
+        count = None
+    
+    paginator = CursorPaginator(
+        queryset, page_size, ordering=rank_ordering(queryset), count=count
+    )
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid cursor'
+        }, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'results': [serialize_task(task) for task in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+        'count': page.count,
+        'count_is_exact': page.count_is_exact,
+    })
+
+
+def _activity_api(request, pk, get_page, serialize):
+    task = Task.objects.only('pk').filter(pk=pk).first() or archive.get_task(pk)
+    if task is None:
+        raise Http404('No task found')
+    
+    try:
+        page_size = min(max(int(request.GET.get('page_size', activity.PAGE_SIZE)), 1), 100)
+    except ValueError:
+        page_size = activity.PAGE_SIZE
+    try:
+        page = get_page(task, request.GET.get('cursor'), per_page=page_size)
+    except InvalidCursor:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid cursor'
+        }, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'results': [serialize(obj) for obj in page],
+        'next_cursor': page.next_cursor,
+    })
+
+
+@login_required
+def task_comments(request, pk):
+    """Older comments of a task for "load more", newest first"""
+    return _activity_api(request, pk, activity.comment_page, serialize_comment)
+
+
+@login_required
+def task_attachments(request, pk):
+    """Older attachments of a task for "load more", newest first"""
+    return _activity_api(request, pk, activity.attachment_page, serialize_attachment)
+
+
+@login_required
+def metrics_api(request):
+    """Daily task metrics for charts, read from the DailyTaskMetric rollups"""
+    metric = request.GET.get('metric', 'completed')
+    dimension = request.GET.get('dimension', 'total')
+    if metric not in metrics.METRICS or dimension not in metrics.DIMENSIONS:
+        return JsonResponse({
+            'success': False,
+            'error': f'metric must be one of {", ".join(metrics.METRICS)} and '
+                     f'dimension one of {", ".join(metrics.DIMENSIONS)}'
+        }, status=400)
+    
+    try:
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - timedelta(days=364)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid date'}, status=400)
+    if start > end or (end - start).days > 2 * 366:
+        return JsonResponse({
+            'success': False,
+            'error': 'The range must run forwards and span at most two years'
+        }, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'metric': metric,
+        'dimension': dimension,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': metrics.series(metric, dimension, start, end),
+    })
+
+
+@login_required
+def export_tasks(request):
+    """Stream the filtered task list as CSV or JSON Lines"""
+    format = request.GET.get('format', 'csv')
+    if format not in FORMATS:
+        return JsonResponse({
+            'success': False,
+            'error': f'Unknown format, expected one of {", ".join(FORMATS)}'
+        }, status=400)
+    invalid = _invalid_filters(request.GET)
+    if invalid:
+        return invalid
+    
+    if request.GET.get('background'):
+        filters = request.GET.dict()
+        filters.pop('background')
+        job = jobs.enqueue('export', {'format': format, 'filters': filters}, user=request.user)
+        return JsonResponse({
+            'success': True,
+            'job': job.pk,
+            'status_url': reverse('job_status', args=[job.pk])
+        }, status=202)
+    
+    queryset = filter_tasks(request.GET, queryset=Task.objects.all()).order_by('pk')
+    content_type = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        render_rows(export_rows(queryset), format), content_type=content_type
+    )
+    response['Content-Disposition'] = f'attachment; filename="tasks.{format}"'
+    return response
+
+
+@login_required
+def job_status(request, pk):
+    """Progress of a background job started by this user"""
+    job = get_object_or_404(Job, pk=pk, created_by=request.user)
+    data = {
+        'success': True,
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'progress': round(job.progress, 3),
+        'result': job.result,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == Job.FAILED:
+        data['error'] = job.error.strip().splitlines()[-1] if job.error else 'Failed'
+    if job.kind == 'export' and job.status == Job.DONE:
+        data['download_url'] = reverse('job_download', args=[job.pk])
+    return JsonResponse(data)
+
+
+@login_required
+def job_download(request, pk):
+    """Download the file written by a finished export job"""
+    job = get_object_or_404(Job, pk=pk, created_by=request.user, kind='export', status=Job.DONE)
+    path = jobs.EXPORT_DIR / job.result['file']
+    if not path.exists():
+        raise Http404('Export file no longer exists')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'tasks.{job.params["format"]}')
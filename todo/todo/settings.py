@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.middleware.QueryProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,9 +78,41 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Keep connections open between requests; the PRAGMAs in
+        # tasks.database then run once per connection.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so waiting for it
+            # honours busy_timeout instead of failing as "database is locked"
+            # when a read transaction tries to upgrade.
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Read-only connections to the same file, used by the read-only views.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# SQLite connection PRAGMAs and read routing (see tasks.database).
+TASK_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+}
+TASK_READ_DATABASE = 'replica'
+
+# Archived tasks are moved to cold tables (see tasks.archive). To keep them
+# in a separate database, add it to DATABASES and name its alias here.
+TASK_ARCHIVE_DATABASE = 'default'
+DATABASE_ROUTERS = ['tasks.routers.ArchiveRouter', 'tasks.database.ReadRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,3 +159,11 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
+
+# Per-request query profiling (see tasks.middleware.QueryProfilerMiddleware).
+# 'ENABLED' defaults to DEBUG.
+QUERY_PROFILER = {
+    'MAX_QUERIES': 50,
+    'MAX_REPEATS': 10,
+    'RAISE': False,
+}